@@ -0,0 +1,61 @@
+"""Add student rebate stats
+
+Revision ID: 0e9bf3e41204
+Revises: 5f967158ba9b
+Create Date: 2026-10-18 11:40:02.551317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e9bf3e41204'
+down_revision: Union[str, None] = '5f967158ba9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('student_rebate_stats',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('total_requests', sa.Integer(), nullable=False),
+    sa.Column('pending_requests', sa.Integer(), nullable=False),
+    sa.Column('approved_requests', sa.Integer(), nullable=False),
+    sa.Column('rejected_requests', sa.Integer(), nullable=False),
+    sa.Column('total_days', sa.Integer(), nullable=False),
+    sa.Column('approved_days', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('student_id')
+    )
+    # Backfill from existing requests and resync the denormalised user column
+    op.execute("""
+        INSERT INTO student_rebate_stats (
+            student_id, total_requests, pending_requests, approved_requests,
+            rejected_requests, total_days, approved_days, updated_at
+        )
+        SELECT
+            student_id,
+            COUNT(id),
+            SUM(CASE WHEN status = 'PENDING' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status = 'APPROVED' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status = 'REJECTED' THEN 1 ELSE 0 END),
+            COALESCE(SUM(total_days), 0),
+            COALESCE(SUM(CASE WHEN status = 'APPROVED' THEN total_days ELSE 0 END), 0),
+            CURRENT_TIMESTAMP
+        FROM rebate_requests
+        GROUP BY student_id
+    """)
+    op.execute("""
+        UPDATE users SET total_rebate_days = COALESCE(
+            (SELECT approved_days FROM student_rebate_stats WHERE student_rebate_stats.student_id = users.id),
+            0
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('student_rebate_stats')
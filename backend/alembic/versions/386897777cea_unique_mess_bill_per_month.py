@@ -0,0 +1,26 @@
+"""Unique mess bill per student and month
+
+Revision ID: 386897777cea
+Revises: 0e9bf3e41204
+Create Date: 2026-10-18 12:31:17.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '386897777cea'
+down_revision: Union[str, None] = '0e9bf3e41204'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('uq_mess_bills_student_month', 'mess_bills', ['student_id', 'month'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_mess_bills_student_month', table_name='mess_bills')
@@ -0,0 +1,83 @@
+"""Hostel daily headcounts
+
+Revision ID: 5b2e8d7a4c19
+Revises: d81a6e3f0c27
+Create Date: 2026-10-18 18:40:12.318604
+
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8d7a4c19'
+down_revision: Union[str, None] = 'd81a6e3f0c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Snapshots of the tables as of this revision, so the backfill doesn't depend on app code
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('hostel', sa.String))
+rebate_requests = sa.table(
+    'rebate_requests',
+    sa.column('student_id', sa.Integer),
+    sa.column('start_date', sa.Date),
+    sa.column('end_date', sa.Date),
+    sa.column('status', sa.String),
+)
+hostel_daily_headcounts = sa.table(
+    'hostel_daily_headcounts',
+    sa.column('hostel', sa.String),
+    sa.column('day', sa.Date),
+    sa.column('approved', sa.Integer),
+    sa.column('pending', sa.Integer),
+)
+WEIGHTS = {'APPROVED': (1, 0), 'PENDING': (0, 1)}
+
+
+def _backfill(conn) -> None:
+    """Sweep each hostel's pending/approved date ranges into per-day counts."""
+    rows = conn.execute(
+        sa.select(users.c.hostel, rebate_requests.c.start_date, rebate_requests.c.end_date, rebate_requests.c.status)
+        .select_from(rebate_requests.join(users, users.c.id == rebate_requests.c.student_id))
+        .where(rebate_requests.c.status.in_(list(WEIGHTS)), users.c.hostel.isnot(None), users.c.hostel != '')
+    ).all()
+    # Difference array per hostel: weights added on the first day, taken back the day after the last
+    diffs = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for hostel, start_date, end_date, status in rows:
+        approved, pending = WEIGHTS[status]
+        for day, sign in ((start_date, 1), (end_date + timedelta(days=1), -1)):
+            diffs[hostel][day][0] += sign * approved
+            diffs[hostel][day][1] += sign * pending
+
+    params = []
+    for hostel, changes in diffs.items():
+        approved = pending = 0
+        days = sorted(changes)
+        for day, next_change in zip(days, days[1:]):
+            approved += changes[day][0]
+            pending += changes[day][1]
+            while (approved or pending) and day < next_change:
+                params.append({'hostel': hostel, 'day': day, 'approved': approved, 'pending': pending})
+                day += timedelta(days=1)
+    for i in range(0, len(params), 1000):
+        conn.execute(sa.insert(hostel_daily_headcounts), params[i:i + 1000])
+
+
+def upgrade() -> None:
+    op.create_table('hostel_daily_headcounts',
+    sa.Column('hostel', sa.String(length=50), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('approved', sa.Integer(), nullable=False),
+    sa.Column('pending', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hostel', 'day')
+    )
+    # Date ranges can't be expanded portably in SQL, so the backfill sweeps them in Python
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_table('hostel_daily_headcounts')
@@ -0,0 +1,32 @@
+"""Add listing indexes
+
+Revision ID: 5f967158ba9b
+Revises: 4d212e25053b
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f967158ba9b'
+down_revision: Union[str, None] = '4d212e25053b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id'], unique=False)
+    op.create_index('ix_users_hostel', 'users', ['hostel'], unique=False)
+    op.create_index('ix_rebate_requests_created_at_id', 'rebate_requests', ['created_at', 'id'], unique=False)
+    op.create_index('ix_rebate_requests_status_created_at_id', 'rebate_requests', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rebate_requests_status_created_at_id', table_name='rebate_requests')
+    op.drop_index('ix_rebate_requests_created_at_id', table_name='rebate_requests')
+    op.drop_index('ix_users_hostel', table_name='users')
+    op.drop_index('ix_users_role_created_at_id', table_name='users')
@@ -0,0 +1,28 @@
+"""OTP lookup indexes
+
+Revision ID: 7c4e2a9d31f0
+Revises: e1118d4d74a2
+Create Date: 2026-10-18 14:02:17.553104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e2a9d31f0'
+down_revision: Union[str, None] = 'e1118d4d74a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_otps_user_id_is_used_expires_at', 'otps', ['user_id', 'is_used', 'expires_at'], unique=False)
+    op.create_index('ix_otps_expires_at', 'otps', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_otps_expires_at', table_name='otps')
+    op.drop_index('ix_otps_user_id_is_used_expires_at', table_name='otps')
@@ -0,0 +1,40 @@
+"""Content-addressed documents
+
+Revision ID: a83f5c0e6b27
+Revises: 7c4e2a9d31f0
+Create Date: 2026-10-18 14:41:52.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83f5c0e6b27'
+down_revision: Union[str, None] = '7c4e2a9d31f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stored_documents',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('storage_key', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('rebate_requests') as batch_op:
+        batch_op.add_column(sa.Column('document_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key('fk_rebate_requests_document_sha256', 'stored_documents', ['document_sha256'], ['sha256'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('rebate_requests') as batch_op:
+        batch_op.drop_constraint('fk_rebate_requests_document_sha256', type_='foreignkey')
+        batch_op.drop_column('document_sha256')
+    op.drop_table('stored_documents')
@@ -0,0 +1,27 @@
+"""User data version for conditional GETs
+
+Revision ID: b4f19c7d2e85
+Revises: a83f5c0e6b27
+Create Date: 2026-10-18 16:41:09.284517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f19c7d2e85'
+down_revision: Union[str, None] = 'a83f5c0e6b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,28 @@
+"""Stored document released_at
+
+Revision ID: c3d7e91a5f48
+Revises: 5b2e8d7a4c19
+Create Date: 2026-10-18 21:12:37.540918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d7e91a5f48'
+down_revision: Union[str, None] = '5b2e8d7a4c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('stored_documents') as batch_op:
+        batch_op.add_column(sa.Column('released_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('stored_documents') as batch_op:
+        batch_op.drop_column('released_at')
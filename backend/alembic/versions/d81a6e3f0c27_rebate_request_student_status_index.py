@@ -0,0 +1,26 @@
+"""Rebate request (student_id, status) index
+
+Revision ID: d81a6e3f0c27
+Revises: b4f19c7d2e85
+Create Date: 2026-10-18 17:25:43.910268
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81a6e3f0c27'
+down_revision: Union[str, None] = 'b4f19c7d2e85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_rebate_requests_student_status', 'rebate_requests', ['student_id', 'status', 'total_days'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rebate_requests_student_status', table_name='rebate_requests')
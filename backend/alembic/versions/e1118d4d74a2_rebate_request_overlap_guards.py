@@ -0,0 +1,41 @@
+"""Rebate request overlap guards
+
+Revision ID: e1118d4d74a2
+Revises: 386897777cea
+Create Date: 2026-10-18 13:05:44.120937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1118d4d74a2'
+down_revision: Union[str, None] = '386897777cea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_rebate_requests_student_dates', 'rebate_requests', ['student_id', 'start_date', 'end_date'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Pending/approved requests of one student may not share a day.
+        # Existing overlapping rows must be resolved before this will apply.
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute("""
+            ALTER TABLE rebate_requests
+            ADD CONSTRAINT ex_rebate_requests_no_overlap
+            EXCLUDE USING gist (
+                student_id WITH =,
+                daterange(start_date, end_date, '[]') WITH &&
+            )
+            WHERE (status IN ('PENDING', 'APPROVED'))
+        """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE rebate_requests DROP CONSTRAINT ex_rebate_requests_no_overlap")
+    op.drop_index('ix_rebate_requests_student_dates', table_name='rebate_requests')
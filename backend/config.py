@@ -4,14 +4,84 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./mess_rebate.db"
+
+    # Connection pool (server databases; SQLite keeps its driver defaults)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30          # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800        # seconds; -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+
+    # SQLite file databases (ignored for server databases)
+    SQLITE_TUNED: bool = True               # False: driver defaults (rollback journal, no pool)
+    SQLITE_JOURNAL_MODE: str = "WAL"        # readers no longer block behind the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"      # fsync at checkpoints, not every commit (safe with WAL)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024   # page cache per connection
+    SQLITE_READ_POOL_SIZE: int = 8
+
+    # SQL profiling (Server-Timing headers, slow-query log, per-route stats)
+    SQL_PROFILING_ENABLED: bool = False
+    SQL_SLOW_QUERY_MS: float = 200.0
+    SQL_PROFILE_TOP_N: int = 3          # slowest statements reported per request
+
+    # Prometheus scrape token for /metrics (admin access tokens also work)
+    METRICS_TOKEN: Optional[str] = None
+
+    # Health probes
+    READINESS_DB_TIMEOUT_SECONDS: float = 2.0
     
+    # Cache (in-process by default; set CACHE_URL=redis://... to share across workers)
+    CACHE_URL: Optional[str] = None
+    DASHBOARD_STATS_TTL_SECONDS: int = 30
+
+    # Push updates over SSE (in-process fan-out; EVENTS_URL=redis://... reaches every worker)
+    EVENTS_URL: Optional[str] = None
+    EVENTS_HEARTBEAT_SECONDS: int = 25      # keeps idle streams open through proxies
+    EVENTS_QUEUE_SIZE: int = 64             # per connection; a stream that falls further behind is closed
+
+    # Rebate rules
+    SEMESTER_REBATE_DAY_CAP: int = 60   # pending + approved days per Jan–Jun / Jul–Dec half
+
+    # Mess headcount forecast
+    HEADCOUNT_FORECAST_DAYS: int = 14   # default window from today
+    HEADCOUNT_MAX_RANGE_DAYS: int = 92
+
+    # Billing
+    MESS_RATE_PER_DAY: float = 120.0
+
+    # Document uploads (STORAGE_BACKEND: "local" or "s3")
+    STORAGE_BACKEND: str = "local"
+    UPLOAD_DIR: str = "uploads/documents"
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None    # e.g. http://localhost:9000 for MinIO
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_URL_EXPIRE_SECONDS: int = 300
+    DOCUMENT_GC_GRACE_SECONDS: int = 3600    # released blobs are kept this long in case an upload re-references them
+    DOCUMENT_GC_INTERVAL_SECONDS: int = 900  # 0 disables the in-process collector
+
     # JWT
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Authenticated-user snapshot cache (per process)
+    AUTH_USER_CACHE_SIZE: int = 4096    # 0 disables the cache
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
     
     # OTP
     OTP_EXPIRE_MINUTES: int = 10
+    OTP_RATE_LIMIT_BURST: int = 3           # OTPs an email can be issued back to back
+    OTP_RATE_LIMIT_PER_MINUTE: float = 1.0  # refill rate of that allowance
+    OTP_MAX_VERIFY_FAILURES: int = 5        # wrong codes before an email's OTPs are voided
+    OTP_VERIFY_LOCKOUT_SECONDS: int = 900   # how long verification then stays refused
+    OTP_PURGE_INTERVAL_SECONDS: int = 3600  # 0 disables the in-process purge job
+    OTP_PURGE_BATCH_SIZE: int = 1000
     
     # Email Configuration
     SMTP_SERVER: str = "smtp.gmail.com"
@@ -19,6 +89,14 @@ class Settings(BaseSettings):
     SMTP_USERNAME: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
     FROM_EMAIL: Optional[str] = None
+    SMTP_USE_TLS: bool = True
+    SMTP_REQUIRE_AUTH: bool = True     # False: send without credentials (e.g. a local relay)
+    SMTP_TIMEOUT_SECONDS: int = 10
+
+    # Email delivery queue
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_MAX_ATTEMPTS: int = 4
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 1.0
     
     class Config:
         env_file = ".env"
@@ -1,16 +1,207 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+# Async drivers used by the request path, keyed on the sync driver name in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+# Dialect-specific INSERT constructs that support ON CONFLICT upserts
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (sqlite → aiosqlite, postgresql → asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+class WaitHistogram:
+    """Cumulative histogram of how long callers waited for a pooled connection."""
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS) + 1)
+        self._sum = 0.0
+        self._timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._sum += seconds
+            if timed_out:
+                self._timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets, running = {}, 0
+            for bound, n in zip(self.BUCKETS + (float("inf"),), self._counts):
+                running += n
+                buckets["+Inf" if bound == float("inf") else str(bound)] = running
+            return {
+                "count": running,
+                "sum_seconds": round(self._sum, 6),
+                "timeouts": self._timeouts,
+                "buckets": buckets,
+            }
+
+class _InstrumentedPoolMixin:
+    # Class-level so the histogram survives pool.recreate() on dispose
+    wait_histogram: WaitHistogram
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_histogram.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_histogram.observe(time.perf_counter() - start)
+        return conn
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    wait_histogram = WaitHistogram()
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    wait_histogram = WaitHistogram()
+
+class InstrumentedWriterPool(InstrumentedAsyncAdaptedQueuePool):
+    """SQLite's single writer connection; its waits are time spent queued behind other writes."""
+    wait_histogram = WaitHistogram()
+
+is_sqlite = "sqlite" in settings.DATABASE_URL
+# Production SQLite profile: pragmas, a read pool and one writer connection
+sqlite_tuned = (
+    is_sqlite
+    and settings.SQLITE_TUNED
+    and make_url(settings.DATABASE_URL).database not in (None, "", ":memory:")
 )
 
+def sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA cache_size={-int(settings.SQLITE_CACHE_SIZE_KB)}",   # negative = KiB
+    ]
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+def _driver_autocommit(dbapi_connection, connection_record):
+    # Leave transaction control to the "begin" listener below
+    dbapi_connection.isolation_level = None
+
+def _begin_immediate(conn):
+    # Take the write lock up front: a deferred transaction that reads first
+    # fails with SQLITE_BUSY (no busy_timeout retry) if another writer
+    # commits before it upgrades
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def engine_options(async_driver: bool, writer: bool = False) -> dict:
+    """create_engine kwargs built from the DB_POOL_* / DB_STATEMENT_TIMEOUT_MS settings."""
+    if is_sqlite:
+        options = {"connect_args": {"check_same_thread": False}}
+        if sqlite_tuned and async_driver:
+            # Pool the request path's connections (aiosqlite defaults to NullPool);
+            # the writer pool holds exactly one, so writers queue for it in-process
+            options.update({
+                "poolclass": InstrumentedWriterPool if writer else InstrumentedAsyncAdaptedQueuePool,
+                "pool_size": 1 if writer else settings.SQLITE_READ_POOL_SIZE,
+                "max_overflow": 0,
+                "pool_timeout": settings.DB_POOL_TIMEOUT,
+            })
+        return options
+
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        if async_driver:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if async_driver else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+# Sync engine: table creation, Alembic and offline scripts
+engine = create_engine(settings.DATABASE_URL, **engine_options(async_driver=False))
+
+# Async engine: every API request goes through this one
+async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), **engine_options(async_driver=True))
+
+# Write path (get_async_write_db). A separate single-connection engine on
+# tuned SQLite, so writes are serialized; the same engine everywhere else.
+if sqlite_tuned:
+    write_engine = create_async_engine(
+        async_database_url(settings.DATABASE_URL), **engine_options(async_driver=True, writer=True)
+    )
+    for target in (engine, async_engine.sync_engine, write_engine.sync_engine):
+        event.listen(target, "connect", _apply_sqlite_pragmas)
+    event.listen(write_engine.sync_engine, "connect", _driver_autocommit)
+    event.listen(write_engine.sync_engine, "begin", _begin_immediate)
+else:
+    write_engine = async_engine
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: handlers read attributes after commit, and an
+# expired attribute would need lazy IO that AsyncSession does not allow.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncWriteSessionLocal = async_sessionmaker(write_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+def pool_stats() -> dict:
+    """Point-in-time usage of the engines' pools, for sizing DB_POOL_SIZE per worker."""
+    stats = {}
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    if write_engine is not async_engine:
+        pools.append(("write", write_engine.sync_engine.pool))
+    for name, pool in pools:
+        entry = {"pool_class": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        if isinstance(pool, _InstrumentedPoolMixin):
+            entry["wait_time"] = pool.wait_histogram.snapshot()
+        stats[name] = entry
+    return stats
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,4 +209,11 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
+async def get_async_write_db():
+    """Session for handlers that write; on tuned SQLite it waits its turn for the single writer."""
+    async with AsyncWriteSessionLocal() as db:
+        yield db
@@ -1,11 +1,22 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import Depends, FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
+from sqlalchemy import text
 
-from database import engine, Base
+from database import engine, async_engine, Base
 import models                   # <- ensure all ORM models (including User) are registered
-from routers import auth, students, admin
+from routers import auth, students, admin, documents, events
+from services.email_service import email_queue
+from services.listing import NEXT_CURSOR_HEADER
+from services.otp import otp_purger
+from services.documents import document_collector
+from services.events import broker
+from services.profiling import SQLProfilingMiddleware, install_query_hooks
+from services.metrics import MetricsMiddleware, render_metrics
+from services.auth_service import verify_metrics_access
+from config import settings
 
 app = FastAPI(
     title="Mess Rebate Management System",
@@ -18,6 +29,42 @@ app = FastAPI(
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
+# Background OTP email delivery
+@app.on_event("startup")
+async def start_email_queue():
+    email_queue.start()
+
+@app.on_event("shutdown")
+async def stop_email_queue():
+    await email_queue.stop()
+
+# Periodic purge of used/expired OTPs
+@app.on_event("startup")
+async def start_otp_purger():
+    otp_purger.start()
+
+@app.on_event("shutdown")
+async def stop_otp_purger():
+    await otp_purger.stop()
+
+# Periodic deletion of released document blobs
+@app.on_event("startup")
+async def start_document_collector():
+    document_collector.start()
+
+@app.on_event("shutdown")
+async def stop_document_collector():
+    await document_collector.stop()
+
+# Push-event fan-out (listens on Redis when EVENTS_URL is set)
+@app.on_event("startup")
+async def start_event_broker():
+    broker.start()
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await broker.stop()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,20 +77,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Per-request SQL profiling; nothing is hooked or wrapped unless enabled
+if settings.SQL_PROFILING_ENABLED:
+    install_query_hooks()
+    app.add_middleware(SQLProfilingMiddleware)
+
+# Request latency / in-flight metrics (outermost, so it times everything)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(students.router, prefix="/api/students", tags=["Students"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
 
 @app.get("/")
 async def root():
     return {"message": "Mess Rebate Management System API", "status": "running"}
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
+    """Liveness: the process is up and serving. Touches nothing external."""
     return {"status": "healthy"}
 
+@app.get("/health/ready")
+async def readiness_check(response: Response):
+    """Readiness: the database answers a trivial query within READINESS_DB_TIMEOUT_SECONDS."""
+    async def ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        # Bounds the pool checkout too, so a saturated pool reads as not ready
+        await asyncio.wait_for(ping(), settings.READINESS_DB_TIMEOUT_SECONDS)
+    except Exception as e:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "unavailable", "database": f"error: {type(e).__name__}"}
+    return {"status": "ready", "database": "ok"}
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_metrics_access)])
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum as SQLEnum, Numeric, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum as SQLEnum, Numeric, Date, Index
+from sqlalchemy import DDL, event, func, literal_column, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from database import Base  # ✅ use Base from database.py
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
@@ -27,6 +29,9 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     total_rebate_days = Column(Integer, default=0)
+    # Bumped on every write to the student's profile, requests or bills;
+    # the ETag of their read endpoints (services/conditional.py)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -44,6 +49,12 @@ class User(Base):
     otps = relationship("OTP", back_populates="user")
     mess_bills = relationship("MessBill", back_populates="student")
 
+    __table_args__ = (
+        # Keyset pagination / filtering for the admin student listings
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_hostel", "hostel"),
+    )
+
 class OTP(Base):
     __tablename__ = "otps"
     
@@ -54,6 +65,13 @@ class OTP(Base):
     is_used = Column(Boolean, default=False)
     expires_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # verify_otp / issue_otp lookup of a user's outstanding codes
+        Index("ix_otps_user_id_is_used_expires_at", "user_id", "is_used", "expires_at"),
+        # purge of expired rows
+        Index("ix_otps_expires_at", "expires_at"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="otps")
@@ -68,6 +86,7 @@ class RebateRequest(Base):
     total_days = Column(Integer, nullable=False)
     reason = Column(Text, nullable=False)
     document_path = Column(String(255), nullable=True)
+    document_sha256 = Column(String(64), ForeignKey("stored_documents.sha256"), nullable=True)
     status = Column(SQLEnum(RequestStatus), default=RequestStatus.PENDING)
     admin_remarks = Column(Text, nullable=True)
     processed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -87,6 +106,31 @@ class RebateRequest(Base):
         back_populates="processed_requests"
     )
 
+    __table_args__ = (
+        # Keyset pagination / filtering for the admin request listings
+        Index("ix_rebate_requests_created_at_id", "created_at", "id"),
+        Index("ix_rebate_requests_status_created_at_id", "status", "created_at", "id"),
+        # Per-student overlap / semester-cap range lookups on create
+        Index("ix_rebate_requests_student_dates", "student_id", "start_date", "end_date"),
+        # Student rebate summary: GROUP BY status over one student, index-only
+        Index("ix_rebate_requests_student_status", "student_id", "status", "total_days"),
+        # Pending/approved requests of one student may not share a day (PostgreSQL only)
+        ExcludeConstraint(
+            (student_id, "="),
+            (func.daterange(start_date, end_date, literal_column("'[]'")), "&&"),
+            name="ex_rebate_requests_no_overlap",
+            using="gist",
+            where=text("status IN ('PENDING', 'APPROVED')"),
+        ).ddl_if(dialect="postgresql"),
+    )
+
+# The exclusion constraint's gist index on an integer column needs btree_gist
+event.listen(
+    RebateRequest.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+
 class MessBill(Base):
     __tablename__ = "mess_bills"
     
@@ -103,3 +147,56 @@ class MessBill(Base):
     
     # Relationships
     student = relationship("User", back_populates="mess_bills")
+
+    __table_args__ = (
+        # One bill per student per month; target of the billing upsert
+        Index("uq_mess_bills_student_month", "student_id", "month", unique=True),
+    )
+
+class StudentRebateStats(Base):
+    """
+    Per-student rebate counters, maintained incrementally on every request
+    status change (services/rebate_stats.py) so admin summaries read one
+    row per student instead of aggregating rebate_requests.
+    """
+    __tablename__ = "student_rebate_stats"
+
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_requests = Column(Integer, nullable=False, default=0)
+    pending_requests = Column(Integer, nullable=False, default=0)
+    approved_requests = Column(Integer, nullable=False, default=0)
+    rejected_requests = Column(Integer, nullable=False, default=0)
+    total_days = Column(Integer, nullable=False, default=0)
+    approved_days = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class HostelDailyHeadcount(Base):
+    """
+    Students on approved / pending rebate per hostel and day, maintained
+    incrementally on every request status change (services/headcount.py)
+    so the mess forecast never expands request date ranges at read time.
+    Days with nobody on rebate have no row.
+    """
+    __tablename__ = "hostel_daily_headcounts"
+
+    hostel = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    approved = Column(Integer, nullable=False, default=0)
+    pending = Column(Integer, nullable=False, default=0)
+
+class StoredDocument(Base):
+    """
+    One row per distinct uploaded file, keyed by its SHA-256. `ref_count` is
+    the number of rebate requests pointing at it; when it drops to zero
+    `released_at` is set and the blob is deleted once DOCUMENT_GC_GRACE_SECONDS
+    pass without a new reference (services/documents.py).
+    """
+    __tablename__ = "stored_documents"
+
+    sha256 = Column(String(64), primary_key=True)
+    storage_key = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True)
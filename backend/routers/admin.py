@@ -1,19 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+import calendar
 
-from database import get_db
-from models import User, RebateRequest, MessBill, UserRole, RequestStatus
+from database import get_async_db, get_async_write_db, pool_stats
+from config import settings
+from models import User, RebateRequest, MessBill, StudentRebateStats, UserRole, RequestStatus
 from schemas import (
     RebateRequest as RebateRequestSchema,
     RebateRequestUpdate,
     MessBillCreate,
     MessBill as MessBillSchema,
     RebateSummary,
+    BatchDecisionRequest,
+    BatchDecisionResponse,
+)
+from services.auth_service import get_token_claims, TokenClaims
+from services.billing import billing_month, generate_month_bills, billing_history
+from services.conditional import bump_data_versions
+from services.events import notify_student, notify_admins
+from services.documents import document_url, thumbnail_url
+from services.export import export_response
+from services.headcount import record_headcount_changes, headcount_forecast
+from services.metrics import REBATE_DECISIONS
+from services.profiling import route_stats
+from services.serialization import json_response
+from services.rebate_stats import (
+    record_status_change,
+    record_status_changes,
+    invalidate_dashboard_stats,
+    cached_dashboard_stats,
+)
+from services.rebate_rules import check_reactivations, check_status_change, commit_rebate_change, reactivates
+from services.listing import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    paginate,
+    filter_students,
+    filter_rebate_requests,
 )
-from services.auth_service import get_current_user
 
 router = APIRouter()
 
@@ -26,28 +54,40 @@ FIXED_ADMIN_EMAILS = [
     "sonalidubeycourseraeco@gmail.com"
 ]
 
-def verify_admin(current_user: User = Depends(get_current_user)):
-    """Ensure the caller is an admin."""
-    if current_user.role != UserRole.ADMIN:
+def verify_admin(claims: TokenClaims = Depends(get_token_claims)):
+    """
+    Ensure the caller is an admin. Decided from the token's role claim, so
+    admin endpoints never look the caller up; promotion happens at login,
+    which always issues a fresh token.
+    """
+    if claims.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. Admin privileges required.",
         )
-    return current_user
+    return claims
 
 @router.get("/students", response_model=List[dict])
 async def get_students_with_rebate_summary(
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    response: Response,
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    List all students along with:
-      - total_rebate_days (sum of total_days for APPROVED requests)
+    List students (newest first, keyset-paginated) along with:
+      - total_rebate_days (sum of total_days across all requests)
       - total_requests, pending/approved/rejected counts
       - approved_rebate_days (sum of total_days for APPROVED)
+    Counters are read from student_rebate_stats rather than aggregated.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    Rows are encoded with orjson, bypassing response_model validation.
     """
     students_query = (
-        db.query(
+        select(
             User.id,
             User.name,
             User.email,
@@ -57,31 +97,20 @@ async def get_students_with_rebate_summary(
             User.phone,
             User.is_active,
             User.created_at,
-            func.coalesce(func.sum(RebateRequest.total_days), 0).label("total_rebate_days"),
-            func.count(RebateRequest.id).label("total_requests"),
-            func.sum(
-                case(
-                    [(RebateRequest.status == RequestStatus.APPROVED, RebateRequest.total_days)],
-                    else_=0,
-                )
-            ).label("approved_rebate_days"),
-            func.sum(
-                case([(RebateRequest.status == RequestStatus.PENDING, 1)], else_=0)
-            ).label("pending_requests"),
-            func.sum(
-                case([(RebateRequest.status == RequestStatus.APPROVED, 1)], else_=0)
-            ).label("approved_requests"),
-            func.sum(
-                case([(RebateRequest.status == RequestStatus.REJECTED, 1)], else_=0)
-            ).label("rejected_requests"),
+            StudentRebateStats.total_days.label("total_rebate_days"),
+            StudentRebateStats.total_requests,
+            StudentRebateStats.approved_days.label("approved_rebate_days"),
+            StudentRebateStats.pending_requests,
+            StudentRebateStats.approved_requests,
+            StudentRebateStats.rejected_requests,
         )
-        .outerjoin(RebateRequest, RebateRequest.student_id == User.id)
-        .filter(User.role == UserRole.STUDENT)
-        .group_by(User.id)
-        .all()
+        .outerjoin(StudentRebateStats, StudentRebateStats.student_id == User.id)
+        .where(User.role == UserRole.STUDENT)
     )
+    students_query = filter_students(students_query, hostel=hostel, roll_prefix=roll_prefix)
+    students_query = await paginate(db, students_query, User.created_at, User.id, cursor, limit, response)
 
-    return [
+    return json_response([
         {
             "id": s.id,
             "name": s.name or "Not provided",
@@ -102,25 +131,26 @@ async def get_students_with_rebate_summary(
             },
         }
         for s in students_query
-    ]
+    ], response)
 
 @router.get("/students/{student_id}/rebate-requests", response_model=dict)
 async def get_student_rebate_requests(
     student_id: int,
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """All rebate requests for a particular student."""
-    student = db.query(User).filter(User.id == student_id, User.role == UserRole.STUDENT).first()
+    student = (await db.execute(
+        select(User).where(User.id == student_id, User.role == UserRole.STUDENT)
+    )).scalars().first()
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
-    items = (
-        db.query(RebateRequest)
-        .filter(RebateRequest.student_id == student_id)
+    items = (await db.execute(
+        select(RebateRequest)
+        .where(RebateRequest.student_id == student_id)
         .order_by(RebateRequest.created_at.desc())
-        .all()
-    )
+    )).scalars().all()
 
     return {
         "student": {
@@ -132,184 +162,582 @@ async def get_student_rebate_requests(
         "requests": [RebateRequestSchema.from_orm(r) for r in items],
     }
 
+def _rebate_request_query(
+    status_filter: Optional[str] = None,
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """
+    Column-only select of rebate requests joined with the owning student's
+    name and roll number, with the listing filters pushed into SQL.
+    """
+    query = (
+        select(
+            RebateRequest.id,
+            RebateRequest.student_id,
+            RebateRequest.start_date,
+            RebateRequest.end_date,
+            RebateRequest.total_days,
+            RebateRequest.reason,
+            RebateRequest.status,
+            RebateRequest.document_path,
+            RebateRequest.admin_remarks,
+            RebateRequest.processed_by,
+            RebateRequest.processed_at,
+            RebateRequest.created_at,
+            User.name.label("student_name"),
+            User.roll_number.label("student_roll_number"),
+        )
+        .join(User, RebateRequest.student_id == User.id)
+    )
+    return filter_rebate_requests(
+        query,
+        status_filter=status_filter,
+        hostel=hostel,
+        roll_prefix=roll_prefix,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+async def _rebate_request_rows(
+    db: AsyncSession,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    **filters,
+):
+    """One keyset page of _rebate_request_query, served by a single statement."""
+    query = _rebate_request_query(**filters)
+    return await paginate(db, query, RebateRequest.created_at, RebateRequest.id, cursor, limit, response)
+
+def _format_rebate_request_row(row) -> dict:
+    """
+    Shape a projected rebate request row for the admin dashboard. Dates are
+    left for orjson to encode (same ISO strings, without a Python call each).
+    """
+    return {
+        "id": row.id,
+        "name": row.student_name or "Unknown",
+        "roll_no": row.student_roll_number or "Unknown",
+        "from_date": row.start_date,
+        "to_date": row.end_date,
+        "reason": row.reason,
+        "status": row.status.value.title(),
+        "submitted_on": row.created_at.date(),
+        "document_url": document_url(row.id) if row.document_path else None,
+        "thumbnail_url": thumbnail_url(row.id) if row.document_path else None,
+        "rejection_reason": row.admin_remarks if row.status == RequestStatus.REJECTED else None,
+        "total_days": row.total_days,
+        "student_id": row.student_id,
+        "processed_at": row.processed_at,
+        "processed_by": row.processed_by,
+    }
+
 @router.get("/rebate-requests", response_model=List[dict])
 async def get_all_rebate_requests(
+    response: Response,
+    status_filter: Optional[str] = None,
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Rebate requests newest first, optionally filtered by status, hostel,
+    roll-number prefix and a date range overlapping the rebate period.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    rows = await _rebate_request_rows(
+        db,
+        response,
+        status_filter=status_filter,
+        hostel=hostel,
+        roll_prefix=roll_prefix,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit,
+    )
+    return json_response([_format_rebate_request_row(r) for r in rows], response)
+
+REBATE_EXPORT_HEADER = [
+    "Request ID", "Roll Number", "Name", "From", "To", "Days", "Status",
+    "Reason", "Admin Remarks", "Submitted On", "Processed At",
+]
+
+@router.get("/export/rebate-requests")
+async def export_rebate_requests(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
     status_filter: Optional[str] = None,
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    admin_user: TokenClaims = Depends(verify_admin),
+):
+    """Stream every matching rebate request as CSV or XLSX (same filters as /rebate-requests)."""
+    query = _rebate_request_query(
+        status_filter=status_filter,
+        hostel=hostel,
+        roll_prefix=roll_prefix,
+        date_from=date_from,
+        date_to=date_to,
+    ).order_by(RebateRequest.created_at.desc(), RebateRequest.id.desc())
+
+    def to_row(r):
+        return [
+            r.id,
+            r.student_roll_number or "",
+            r.student_name or "",
+            r.start_date,
+            r.end_date,
+            r.total_days,
+            r.status.value.title(),
+            r.reason,
+            r.admin_remarks or "",
+            r.created_at,
+            r.processed_at or "",
+        ]
+
+    return export_response(format, "rebate_requests", REBATE_EXPORT_HEADER, query, to_row)
+
+async def _locked_rebate_request(db: AsyncSession, request_id: int) -> RebateRequest:
+    """
+    Load a request for a status change under a row lock (SELECT ... FOR
+    UPDATE), so concurrent decisions on it serialize and the counter deltas
+    are computed from the status actually being replaced.
+    """
+    rr = (await db.execute(
+        select(RebateRequest)
+        .where(RebateRequest.id == request_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )).scalars().first()
+    if not rr:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rebate request not found")
+    return rr
+
+async def _notify_decisions(new_status: RequestStatus, changed: List[tuple]):
+    """Push committed decisions to each affected student and, once, to the admins."""
+    for request_id, student_id in changed:
+        await notify_student(student_id, "rebate_request.updated", request_id=request_id, status=new_status.value)
+    await notify_admins("rebate_requests.decided", request_ids=[r for r, _ in changed], status=new_status.value)
+
+async def _change_status(
+    db: AsyncSession,
+    rr: RebateRequest,
+    new_status: RequestStatus,
+    admin_id: int,
+    remarks: Optional[str] = None,
 ):
-    """All rebate requests, optionally filtered by status."""
-    query = db.query(RebateRequest).join(User, RebateRequest.student_id == User.id)
-
-    if status_filter:
-        try:
-            enum_status = RequestStatus(status_filter.lower())
-            query = query.filter(RebateRequest.status == enum_status)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status filter")
-
-    items = query.order_by(RebateRequest.created_at.desc()).all()
-
-    formatted = []
-    for req in items:
-        student = db.query(User).get(req.student_id)
-        formatted.append({
-            "id": req.id,
-            "name": student.name if student else "Unknown",
-            "roll_no": student.roll_number if student else "Unknown",
-            "from_date": req.start_date.isoformat(),
-            "to_date": req.end_date.isoformat(),
-            "reason": req.reason,
-            "status": req.status.value.title(),
-            "submitted_on": req.created_at.strftime("%Y-%m-%d"),
-            "document_url": req.document_path,
-            "rejection_reason": req.admin_remarks if req.status == RequestStatus.REJECTED else None,
-            "total_days": req.total_days,
-            "student_id": req.student_id,
-            "processed_at": req.processed_at.isoformat() if req.processed_at else None,
-            "processed_by": req.processed_by,
-        })
-    return formatted
+    """
+    The single-request status transition: rule checks, counter and headcount
+    deltas, the student's data version and the commit, in that order.
+    """
+    await check_status_change(db, rr, new_status)
+    await record_status_change(db, rr.student_id, rr.total_days, rr.status, new_status)
+    await record_headcount_changes(db, [(rr.student_id, rr.start_date, rr.end_date, rr.status, new_status)])
+    await bump_data_versions(db, User.id == rr.student_id)
+    rr.status = new_status
+    if remarks:
+        rr.admin_remarks = remarks
+    rr.processed_by = admin_id
+    rr.processed_at = datetime.utcnow()
+    await commit_rebate_change(db)
+    await invalidate_dashboard_stats()
 
 @router.put("/rebate-requests/{request_id}", response_model=RebateRequestSchema)
 async def update_rebate_request(
     request_id: int,
     update_data: RebateRequestUpdate,
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     """Generic update of a rebate request (approve/reject)."""
-    rr = db.query(RebateRequest).get(request_id)
-    if not rr:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rebate request not found")
+    rr = await _locked_rebate_request(db, request_id)
 
     if update_data.status not in RequestStatus:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status")
 
-    rr.status = update_data.status
-    if update_data.admin_remarks:
-        rr.admin_remarks = update_data.admin_remarks
-    rr.processed_by = admin_user.id
-    rr.processed_at = datetime.utcnow()
+    decided = rr.status != update_data.status and update_data.status != RequestStatus.PENDING
+    await _change_status(db, rr, update_data.status, admin_user.id, update_data.admin_remarks)
+    if decided:
+        REBATE_DECISIONS.labels(rr.status.value, "update").inc()
+    await db.refresh(rr)
+    await _notify_decisions(new_status=rr.status, changed=[(rr.id, rr.student_id)])
+    return RebateRequestSchema.from_orm(rr)
 
-    # ── **NEW**: if approving, bump student's total_rebate_days
-    if update_data.status == RequestStatus.APPROVED:
-        student = db.query(User).get(rr.student_id)
-        student.total_rebate_days = (student.total_rebate_days or 0) + rr.total_days
+@router.post("/rebate-requests/batch", response_model=BatchDecisionResponse)
+async def batch_decide_rebate_requests(
+    batch: BatchDecisionRequest,
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_write_db),
+):
+    """
+    Approve or reject many requests in one transaction: one locking read,
+    one bulk UPDATE of the requests and one grouped update of the per-student
+    counters. Requests already in the target status are left untouched;
+    rejected requests that an approval would make overlap another request or
+    exceed the semester cap are skipped and reported as "conflict".
+    """
+    new_status = RequestStatus.APPROVED if batch.decision == "approve" else RequestStatus.REJECTED
+    request_ids = list(dict.fromkeys(batch.request_ids))
+
+    current = {
+        row.id: row
+        for row in (await db.execute(
+            select(
+                RebateRequest.id,
+                RebateRequest.student_id,
+                RebateRequest.start_date,
+                RebateRequest.end_date,
+                RebateRequest.total_days,
+                RebateRequest.status,
+            )
+            .where(RebateRequest.id.in_(request_ids))
+            .order_by(RebateRequest.id)  # one lock order, so overlapping batches can't deadlock
+            .with_for_update()
+        )).all()
+    }
+    changed = [current[i] for i in request_ids if i in current and current[i].status != new_status]
 
-    db.commit()
-    db.refresh(rr)
-    return RebateRequestSchema.from_orm(rr)
+    conflicts = await check_reactivations(db, [r for r in changed if reactivates(r.status, new_status)])
+    changed = [r for r in changed if r.id not in conflicts]
+
+    if changed:
+        values = {
+            "status": new_status,
+            "processed_by": admin_user.id,
+            "processed_at": datetime.utcnow(),
+        }
+        if new_status == RequestStatus.REJECTED:
+            values["admin_remarks"] = batch.reason or "No reason provided"
+        elif batch.reason:
+            values["admin_remarks"] = batch.reason
+        await db.execute(
+            update(RebateRequest)
+            .where(RebateRequest.id.in_([r.id for r in changed]))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await record_status_changes(
+            db, [(r.student_id, r.total_days, r.status, new_status) for r in changed]
+        )
+        await record_headcount_changes(
+            db, [(r.student_id, r.start_date, r.end_date, r.status, new_status) for r in changed]
+        )
+        await bump_data_versions(db, User.id.in_({r.student_id for r in changed}))
+        await commit_rebate_change(db)
+        REBATE_DECISIONS.labels(new_status.value, "batch").inc(len(changed))
+        await invalidate_dashboard_stats()
+        await _notify_decisions(new_status=new_status, changed=[(r.id, r.student_id) for r in changed])
+
+    changed_ids = {r.id for r in changed}
+    return BatchDecisionResponse(
+        updated=len(changed_ids),
+        results=[
+            {
+                "id": i,
+                "result": (
+                    "updated" if i in changed_ids
+                    else "conflict" if i in conflicts
+                    else "unchanged" if i in current
+                    else "not_found"
+                ),
+            }
+            for i in request_ids
+        ],
+    )
 
 @router.post("/requests/{request_id}/approve")
 async def approve_request(
     request_id: int,
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     """Shortcut endpoint to approve a request."""
-    rr = db.query(RebateRequest).get(request_id)
-    if not rr:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rebate request not found")
+    rr = await _locked_rebate_request(db, request_id)
 
-    rr.status = RequestStatus.APPROVED
-    rr.processed_by = admin_user.id
-    rr.processed_at = datetime.utcnow()
-
-    # ── **NEW**: bump total_rebate_days
-    student = db.query(User).get(rr.student_id)
-    student.total_rebate_days = (student.total_rebate_days or 0) + rr.total_days
-
-    db.commit()
+    decided = rr.status != RequestStatus.APPROVED
+    await _change_status(db, rr, RequestStatus.APPROVED, admin_user.id)
+    if decided:
+        REBATE_DECISIONS.labels("approved", "single").inc()
+    await _notify_decisions(new_status=RequestStatus.APPROVED, changed=[(rr.id, rr.student_id)])
     return {"message": "Request approved successfully"}
 
 @router.post("/requests/{request_id}/reject")
 async def reject_request(
     request_id: int,
     rejection_data: dict,
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     """Shortcut endpoint to reject a request with reason."""
-    rr = db.query(RebateRequest).get(request_id)
-    if not rr:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rebate request not found")
+    rr = await _locked_rebate_request(db, request_id)
 
-    rr.status = RequestStatus.REJECTED
-    rr.admin_remarks = rejection_data.get("reason", "No reason provided")
-    rr.processed_by = admin_user.id
-    rr.processed_at = datetime.utcnow()
-
-    db.commit()
+    decided = rr.status != RequestStatus.REJECTED
+    await _change_status(
+        db, rr, RequestStatus.REJECTED, admin_user.id, rejection_data.get("reason") or "No reason provided"
+    )
+    if decided:
+        REBATE_DECISIONS.labels("rejected", "single").inc()
+    await _notify_decisions(new_status=RequestStatus.REJECTED, changed=[(rr.id, rr.student_id)])
     return {"message": "Request rejected successfully"}
 
 @router.get("/requests", response_model=List[dict])
 async def get_requests_for_dashboard(
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Frontend-friendly list for admin dashboard."""
-    return await get_all_rebate_requests(admin_user=admin_user, db=db)
+    rows = await _rebate_request_rows(db, response, cursor=cursor, limit=limit)
+    return json_response([_format_rebate_request_row(r) for r in rows], response)
 
 @router.get("/dashboard-stats", response_model=dict)
 async def get_dashboard_stats(
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Counts for the admin dashboard cards."""
-    total_students = db.query(User).filter(User.role == UserRole.STUDENT).count()
-    pending = db.query(RebateRequest).filter(RebateRequest.status == RequestStatus.PENDING).count()
-    approved = db.query(RebateRequest).filter(RebateRequest.status == RequestStatus.APPROVED).count()
-    rejected = db.query(RebateRequest).filter(RebateRequest.status == RequestStatus.REJECTED).count()
+    """Counts for the admin dashboard cards (cached briefly, invalidated on writes)."""
+    return await cached_dashboard_stats(db)
+
+@router.get("/headcount-forecast", response_model=dict)
+async def get_headcount_forecast(
+    start: Optional[date] = Query(None, description="first day (default today)"),
+    end: Optional[date] = Query(None, description="last day (default HEADCOUNT_FORECAST_DAYS from start)"),
+    hostel: Optional[str] = None,
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Daily students on approved/pending rebate and expected mess headcount, per hostel."""
+    start = start or date.today()
+    end = end or start + timedelta(days=settings.HEADCOUNT_FORECAST_DAYS - 1)
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must not be before start")
+    if (end - start).days + 1 > settings.HEADCOUNT_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range is limited to {settings.HEADCOUNT_MAX_RANGE_DAYS} days",
+        )
+    return {"start": start, "end": end, "hostels": await headcount_forecast(db, start, end, hostel)}
 
-    total_days = db.query(func.sum(RebateRequest.total_days))\
-        .filter(RebateRequest.status == RequestStatus.APPROVED).scalar() or 0
+@router.get("/db-pool-stats", response_model=dict)
+async def get_db_pool_stats(admin_user: TokenClaims = Depends(verify_admin)):
+    """Connection pool usage and checkout wait-time histogram for this worker."""
+    return pool_stats()
 
+@router.get("/sql-profile", response_model=dict)
+async def get_sql_profile(admin_user: TokenClaims = Depends(verify_admin)):
+    """Per-route SQL statement counts and DB time for this worker, heaviest first."""
     return {
-        "total_students": total_students,
-        "pending_requests": pending,
-        "approved_requests": approved,
-        "rejected_requests": rejected,
-        "total_requests": pending + approved + rejected,
-        "total_approved_rebate_days": int(total_days),
+        "enabled": settings.SQL_PROFILING_ENABLED,
+        "slow_query_ms": settings.SQL_SLOW_QUERY_MS,
+        "routes": route_stats.snapshot(),
     }
 
+@router.delete("/sql-profile", response_model=dict)
+async def reset_sql_profile(admin_user: TokenClaims = Depends(verify_admin)):
+    route_stats.reset()
+    return {"message": "SQL profile reset"}
+
 @router.post("/mess-bills", response_model=MessBillSchema)
 async def create_mess_bill(
     bill_data: MessBillCreate,
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     """Create a new mess bill (admin only)."""
-    student = db.query(User).filter(User.id == bill_data.student_id, User.role == UserRole.STUDENT).first()
+    student = (await db.execute(
+        select(User).where(User.id == bill_data.student_id, User.role == UserRole.STUDENT)
+    )).scalars().first()
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
-    existing = db.query(MessBill).filter(
-        MessBill.student_id == bill_data.student_id,
-        MessBill.month == bill_data.month
-    ).first()
+    existing = (await db.execute(
+        select(MessBill).where(
+            MessBill.student_id == bill_data.student_id,
+            MessBill.month == bill_data.month
+        )
+    )).scalars().first()
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bill already exists for this month")
 
     mb = MessBill(**bill_data.dict())
     db.add(mb)
-    db.commit()
-    db.refresh(mb)
+    await bump_data_versions(db, User.id == bill_data.student_id)
+    await db.commit()
+    await db.refresh(mb)
     return MessBillSchema.from_orm(mb)
 
 
+@router.get("/bills/config", response_model=dict)
+async def get_billing_config(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2000, le=2100),
+    admin_user: TokenClaims = Depends(verify_admin),
+):
+    """Per-day mess rate and the full-month amount for one student before rebates."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    return {
+        "ratePerDay": settings.MESS_RATE_PER_DAY,
+        "daysInMonth": days_in_month,
+        "estimatedAmount": round(settings.MESS_RATE_PER_DAY * days_in_month, 2),
+    }
+
+@router.post("/bills/generate", response_model=dict)
+# Kept for the dashboard's "Apply rebates" button; re-applying rebates is a regeneration
+@router.post("/bills/apply-rebates", response_model=dict)
+async def generate_bills(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2000, le=2100),
+    rate_per_day: Optional[Decimal] = Query(None, gt=0),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_write_db),
+):
+    """
+    Generate (or regenerate) every student's bill for the month with approved
+    rebate days applied. Idempotent per month; paid bills are not touched.
+    """
+    rate = rate_per_day if rate_per_day is not None else Decimal(str(settings.MESS_RATE_PER_DAY))
+    return await generate_month_bills(db, year, month, rate)
+
+@router.get("/bills/history", response_model=List[dict])
+async def get_billing_history(
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Totals for each month that has bills."""
+    return [
+        {
+            "month": h.month[5:],
+            "year": h.month[:4],
+            "billCount": h.bill_count,
+            "totalAmount": float(h.total_amount),
+            "rebateAmount": float(h.rebate_amount),
+            "generatedOn": h.generated_on.strftime("%Y-%m-%d") if h.generated_on else None,
+        }
+        for h in await billing_history(db)
+    ]
+
+@router.get("/bills", response_model=List[dict])
+async def get_month_bills(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2000, le=2100),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """All bills for one month with the student's name and roll number."""
+    rows = (await db.execute(
+        select(
+            MessBill.id,
+            MessBill.student_id,
+            MessBill.total_amount,
+            MessBill.rebate_amount,
+            MessBill.final_amount,
+            MessBill.is_paid,
+            User.name,
+            User.roll_number,
+        )
+        .join(User, MessBill.student_id == User.id)
+        .where(MessBill.month == billing_month(year, month))
+        .order_by(User.roll_number)
+    )).all()
+    return [
+        {
+            "id": b.id,
+            "studentId": b.student_id,
+            "rollNo": b.roll_number or "",
+            "name": b.name or "",
+            "totalAmount": float(b.final_amount),
+            "messAmount": float(b.total_amount),
+            "rebateAmount": float(b.rebate_amount or 0),
+            "status": "Paid" if b.is_paid else "Unpaid",
+        }
+        for b in rows
+    ]
+
+BILL_EXPORT_HEADER = [
+    "Month", "Roll Number", "Name", "Hostel", "Mess Amount", "Rebate Amount", "Final Amount", "Paid",
+]
+
+@router.get("/export/bills")
+async def export_bills(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    admin_user: TokenClaims = Depends(verify_admin),
+):
+    """Stream mess bills as CSV or XLSX, for one month when month and year are given."""
+    query = (
+        select(
+            MessBill.month,
+            MessBill.total_amount,
+            MessBill.rebate_amount,
+            MessBill.final_amount,
+            MessBill.is_paid,
+            User.name,
+            User.roll_number,
+            User.hostel,
+        )
+        .join(User, MessBill.student_id == User.id)
+        .order_by(MessBill.month.desc(), MessBill.id)
+    )
+    if month and year:
+        query = query.where(MessBill.month == billing_month(year, month))
+
+    def to_row(b):
+        return [
+            b.month,
+            b.roll_number or "",
+            b.name or "",
+            b.hostel or "",
+            float(b.total_amount),
+            float(b.rebate_amount or 0),
+            float(b.final_amount),
+            "Yes" if b.is_paid else "No",
+        ]
+
+    return export_response(format, "mess_bills", BILL_EXPORT_HEADER, query, to_row)
+
 @router.get("/students/list", response_model=List[dict])
 async def get_basic_student_list(
-    admin_user: User = Depends(verify_admin),
-    db: Session = Depends(get_db),
+    response: Response,
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin_user: TokenClaims = Depends(verify_admin),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Return list of all registered students with basic details
+    Return registered students with basic details, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
-    students = db.query(User).filter(User.role == UserRole.STUDENT).all()
+    query = (
+        select(
+            User.id,
+            User.name,
+            User.roll_number,
+            User.email,
+            User.room_number,
+            User.phone,
+            User.created_at,
+        )
+        .where(User.role == UserRole.STUDENT)
+    )
+    query = filter_students(query, hostel=hostel, roll_prefix=roll_prefix)
+    students = await paginate(db, query, User.created_at, User.id, cursor, limit, response)
 
-    return [
+    return json_response([
         {
             "id": s.id,
             "name": s.name,
@@ -319,4 +747,4 @@ async def get_basic_student_list(
             "phone": s.phone,
         }
         for s in students
-    ]
+    ], response)
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-import random
-import string
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 
-from database import get_db
+from database import get_async_db, get_async_write_db
 from models import User, OTP, UserRole
 from schemas import (
     LoginRequest,
@@ -15,15 +14,20 @@ from schemas import (
     RegisterRequest,
 )
 from services.email_service import send_otp_email
-from services.auth_service import create_access_token, get_current_user
+from services.otp import (
+    check_otp_rate_limit,
+    check_otp_verify_lock,
+    clear_otp_failures,
+    issue_otp,
+    record_otp_failure,
+)
+from services.metrics import OTP_VERIFICATIONS
+from services.auth_service import create_user_token, get_current_user, forget_users_after_commit
+from services.rebate_stats import invalidate_dashboard_stats
 from config import settings
 
 router = APIRouter()
 
-def generate_otp(length: int = 6) -> str:
-    """Generate a random numeric OTP."""
-    return "".join(random.choices(string.digits, k=length))
-
 # 🔧 FIXED LIST OF ADMIN EMAILS
 FIXED_ADMIN_EMAILS = {
     "admin1@hall6.ac.in",
@@ -34,12 +38,15 @@ FIXED_ADMIN_EMAILS = {
 }
 
 @router.post("/register", response_model=OTPResponse)
-async def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
+async def register(register_data: RegisterRequest, db: AsyncSession = Depends(get_async_write_db)):
     """Register a new student and send OTP for verification."""
-    existing_user = db.query(User).filter(
-        (User.email == register_data.email) |
-        (User.roll_number == register_data.roll_number)
-    ).first()
+    check_otp_rate_limit(register_data.email)
+    existing_user = (await db.execute(
+        select(User).where(
+            (User.email == register_data.email) |
+            (User.roll_number == register_data.roll_number)
+        )
+    )).scalars().first()
 
     if existing_user:
         raise HTTPException(
@@ -58,19 +65,12 @@ async def register(register_data: RegisterRequest, db: Session = Depends(get_db)
         is_verified=False
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    otp_code = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
-    otp = OTP(
-        user_id=user.id,
-        otp_code=otp_code,
-        purpose="registration",
-        expires_at=expires_at
-    )
-    db.add(otp)
-    db.commit()
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_dashboard_stats()
+
+    otp_code = await issue_otp(db, user.id, purpose="registration")
+    await db.commit()
 
     send_otp_email(user.email, otp_code, purpose="registration")
 
@@ -80,7 +80,7 @@ async def register(register_data: RegisterRequest, db: Session = Depends(get_db)
     )
 
 @router.post("/login", response_model=OTPResponse)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_write_db)):
     """
     Send OTP for login.
     • If email ∈ FIXED_ADMIN_EMAILS → ADMIN login (no roll_number).
@@ -88,16 +88,18 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     • Else → STUDENT login (requires roll_number & verified).
     """
     email = login_data.email.lower().strip()
+    check_otp_rate_limit(email)
 
     if email in FIXED_ADMIN_EMAILS:
         # 🔧 Admin path: lookup or promote/create
-        user = db.query(User).filter(User.email == email).first()
+        user = (await db.execute(select(User).where(User.email == email))).scalars().first()
         if user:
             if user.role != UserRole.ADMIN:
                 user.role = UserRole.ADMIN
                 user.is_verified = True
-                db.commit()
-                db.refresh(user)
+                forget_users_after_commit(db, [user.id])
+                await db.commit()
+                await db.refresh(user)
         else:
             user = User(
                 name="Admin",
@@ -106,8 +108,8 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
                 is_verified=True
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
     else:
         # 🔧 Student path: require roll_number
         if not login_data.roll_number:
@@ -115,27 +117,21 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="roll_number is required for student login"
             )
-        user = db.query(User).filter(
-            User.email == email,
-            User.roll_number == login_data.roll_number
-        ).first()
+        user = (await db.execute(
+            select(User).where(
+                User.email == email,
+                User.roll_number == login_data.roll_number
+            )
+        )).scalars().first()
         if not user or not user.is_verified:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Student not found or not verified. Please register first."
             )
 
-    # Generate & store OTP
-    otp_code = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
-    otp = OTP(
-        user_id=user.id,
-        otp_code=otp_code,
-        purpose="login",
-        expires_at=expires_at
-    )
-    db.add(otp)
-    db.commit()
+    # Generate & store OTP (earlier outstanding codes stop working)
+    otp_code = await issue_otp(db, user.id, purpose="login")
+    await db.commit()
 
     send_otp_email(user.email, otp_code, purpose="login")
 
@@ -145,26 +141,36 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     )
 
 @router.post("/verify-otp", response_model=Token)
-async def verify_otp(otp_data: OTPVerifyRequest, db: Session = Depends(get_db)):
+async def verify_otp(otp_data: OTPVerifyRequest, db: AsyncSession = Depends(get_async_write_db)):
     """Verify OTP and issue an access token."""
-    user = db.query(User).filter(User.email == otp_data.email).first()
+    check_otp_verify_lock(otp_data.email)
+    user = (await db.execute(select(User).where(User.email == otp_data.email))).scalars().first()
     if not user:
+        OTP_VERIFICATIONS.labels("unknown_user").inc()
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    otp = db.query(OTP).filter(
-        OTP.user_id == user.id,
-        OTP.otp_code == otp_data.otp_code,
-        OTP.is_used == False,
-        OTP.expires_at > datetime.utcnow()
-    ).first()
+    otp = (await db.execute(
+        select(OTP).where(
+            OTP.user_id == user.id,
+            OTP.otp_code == otp_data.otp_code,
+            OTP.is_used == False,
+            OTP.expires_at > datetime.utcnow()
+        )
+    )).scalars().first()
     if not otp:
+        await record_otp_failure(db, otp_data.email, user.id)
+        OTP_VERIFICATIONS.labels("invalid").inc()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired OTP")
 
     otp.is_used = True
-    user.is_verified = True
-    db.commit()
-
-    access_token = create_access_token(data={"sub": user.email})
+    if not user.is_verified:
+        user.is_verified = True
+        forget_users_after_commit(db, [user.id])
+    await db.commit()
+
+    clear_otp_failures(otp_data.email)
+    OTP_VERIFICATIONS.labels("success").inc()
+    access_token = create_user_token(user)
     return Token(
         access_token=access_token,
         token_type="bearer",
@@ -183,12 +189,14 @@ async def logout():
     return {"message": "Successfully logged out"}
 
 @router.post("/check-user")
-async def check_user_exists(email: str, roll_number: str, db: Session = Depends(get_db)):
+async def check_user_exists(email: str, roll_number: str, db: AsyncSession = Depends(get_async_db)):
     """Check if a student exists and is verified."""
-    user = db.query(User).filter(
-        User.email == email,
-        User.roll_number == roll_number
-    ).first()
+    user = (await db.execute(
+        select(User).where(
+            User.email == email,
+            User.roll_number == roll_number
+        )
+    )).scalars().first()
     return {
         "exists": user is not None,
         "is_verified": user.is_verified if user else False
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import RebateRequest, StoredDocument, UserRole
+from services.auth_service import TokenClaims, get_token_claims_or_query
+from services.delivery import etag_for, etag_matches, file_response, not_modified
+from services.previews import THUMBNAIL_WIDTHS, ensure_thumbnail
+from services.storage import storage
+
+router = APIRouter()
+
+# The URL is per request and its document can be replaced, so clients must
+# revalidate; the ETag makes that a 304 without a body.
+DOCUMENT_CACHE_CONTROL = "private, no-cache"
+
+async def _authorized_document(db: AsyncSession, request_id: int, user: TokenClaims) -> StoredDocument:
+    """
+    The request's stored document, for an admin or the student who owns the
+    request. The viewer loads these routes from <iframe>/<img>, which cannot
+    set headers, so the token may also come as ?access_token=.
+    """
+    row = (await db.execute(
+        select(RebateRequest.student_id, StoredDocument)
+        .join(StoredDocument, StoredDocument.sha256 == RebateRequest.document_sha256)
+        .where(RebateRequest.id == request_id)
+    )).first()
+    if row is None or (user.role != UserRole.ADMIN and row.student_id != user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    return row.StoredDocument
+
+async def _serve(request: Request, key: str, media_type: str, etag: str):
+    """Local blobs are sent directly; remote ones redirect to a short-lived URL."""
+    path = storage.local_path(key)
+    if path is None:
+        return RedirectResponse(await storage.download_url(key, media_type), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    return file_response(request, path, media_type, etag, DOCUMENT_CACHE_CONTROL)
+
+@router.get("/rebate-requests/{request_id}")
+async def get_rebate_request_document(
+    request_id: int,
+    request: Request,
+    current_user: TokenClaims = Depends(get_token_claims_or_query),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Supporting document of a rebate request (Range and If-None-Match aware)."""
+    document = await _authorized_document(db, request_id, current_user)
+    etag = etag_for(document.sha256)
+    if etag_matches(request, etag):
+        return not_modified(etag, DOCUMENT_CACHE_CONTROL)
+    return await _serve(request, document.storage_key, document.content_type, etag)
+
+@router.get("/rebate-requests/{request_id}/thumbnail")
+async def get_rebate_request_thumbnail(
+    request_id: int,
+    request: Request,
+    width: int = Query(320),
+    current_user: TokenClaims = Depends(get_token_claims_or_query),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """JPEG preview of the document (first page for PDFs), rendered once and cached."""
+    if width not in THUMBNAIL_WIDTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"width must be one of {', '.join(map(str, THUMBNAIL_WIDTHS))}",
+        )
+    document = await _authorized_document(db, request_id, current_user)
+    etag = etag_for(document.sha256, f"w{width}")
+    if etag_matches(request, etag):
+        return not_modified(etag, DOCUMENT_CACHE_CONTROL)
+    key = await ensure_thumbnail(document, width)
+    return await _serve(request, key, "image/jpeg", etag)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from models import UserRole
+from services.auth_service import TokenClaims, get_token_claims_or_query
+from services.events import ADMIN_TOPIC, student_topic, event_frames
+
+router = APIRouter()
+
+@router.get("/stream")
+async def event_stream(claims: TokenClaims = Depends(get_token_claims_or_query)):
+    """
+    Server-sent events for the caller: students get changes to their own
+    rebate requests, admins get new requests and decisions. Browsers'
+    EventSource cannot set headers, so the token may be passed as
+    ?access_token= instead. Holds no database session while open.
+    """
+    topic = ADMIN_TOPIC if claims.role == UserRole.ADMIN else student_topic(claims.id)
+    return StreamingResponse(
+        event_frames(topic),
+        media_type="text/event-stream",
+        # no-transform/X-Accel-Buffering: keep proxies from buffering the stream
+        headers={"cache-control": "no-cache, no-transform", "x-accel-buffering": "no"},
+    )
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import cast, String
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from collections import defaultdict
 import os
-import uuid
 from datetime import date
 
-from database import get_db
-from models import User, RebateRequest, MessBill, UserRole
+from config import settings
+from database import get_async_db, get_async_write_db
+from models import User, RebateRequest, MessBill, UserRole, RequestStatus
 from schemas import (
     RebateRequestCreate,
     RebateRequest as RebateRequestSchema,
@@ -15,19 +16,33 @@ from schemas import (
     RebateSummary,
     UserUpdate,
 )
-from services.auth_service import get_current_user
+from services.auth_service import get_current_user, forget_users_after_commit
+from services.events import notify_admins
+from services.conditional import bump_data_versions, conditional_response, payload_etag, payload_hash, student_not_modified
+from services.rebate_stats import record_status_change, invalidate_dashboard_stats
+from services.rebate_rules import check_new_rebate_request, commit_rebate_change
+from services.headcount import record_headcount_changes, move_student_headcounts
+from services.documents import CONTENT_TYPES, add_document_reference, release_document_reference, store_upload
+from services.storage import spool_upload
+from services.listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, filter_rebate_requests
+from services.serialization import (
+    REBATE_REQUEST_COLUMNS,
+    MESS_BILL_COLUMNS,
+    rebate_request_items,
+    mess_bill_items,
+    json_response,
+)
 
 
 router = APIRouter(tags=["students"])
 
+HOME_SECTIONS = ("profile", "summary", "rebate_requests", "mess_bills")
+
 def calculate_days(start_date: date, end_date: date) -> int:
     """Calculate inclusive number of days between two dates."""
     return (end_date - start_date).days + 1
 
-@router.get("/profile", response_model=dict)
-async def get_profile(current_user: User = Depends(get_current_user)):
-    if current_user.role != UserRole.STUDENT:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
+def _profile(current_user: User) -> dict:
     return {
         "id": current_user.id,
         "name": current_user.name,
@@ -39,24 +54,81 @@ async def get_profile(current_user: User = Depends(get_current_user)):
         "total_rebate_days": current_user.total_rebate_days,
     }
 
+def _summary(groups) -> RebateSummary:
+    """RebateSummary from `(status, count, days)` groups."""
+    counts, days = defaultdict(int), defaultdict(int)
+    for group_status, count, total_days in groups:
+        counts[group_status] += count
+        days[group_status] += total_days or 0
+    return RebateSummary(
+        total=sum(counts.values()),
+        pending=counts[RequestStatus.PENDING],
+        approved=counts[RequestStatus.APPROVED],
+        rejected=counts[RequestStatus.REJECTED],
+        approved_days=days[RequestStatus.APPROVED],
+    )
+
+async def _rebate_summary(db: AsyncSession, student_id: int) -> RebateSummary:
+    # One GROUP BY over ix_rebate_requests_student_status instead of a count per status
+    return _summary((await db.execute(
+        select(RebateRequest.status, func.count(), func.sum(RebateRequest.total_days))
+        .where(RebateRequest.student_id == student_id)
+        .group_by(RebateRequest.status)
+    )).all())
+
+async def _own_rebate_request_rows(db: AsyncSession, student_id: int):
+    return (await db.execute(
+        select(*REBATE_REQUEST_COLUMNS)
+        .where(RebateRequest.student_id == student_id)
+        .order_by(RebateRequest.created_at.desc())
+    )).all()
+
+def _home_sections(fields: Optional[str]) -> tuple:
+    if not fields:
+        return HOME_SECTIONS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(HOME_SECTIONS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Choose from {', '.join(HOME_SECTIONS)}.",
+        )
+    return tuple(s for s in HOME_SECTIONS if s in requested)
+
+@router.get("/profile", response_model=dict)
+async def get_profile(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    # Built from the cached user snapshot, so its ETag is a hash of the body: no query either way
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
+    profile = _profile(current_user)
+    cached = conditional_response(request, response, payload_etag(profile))
+    if cached is not None:
+        return cached
+    return profile
+
 @router.put("/profile", response_model=dict)
 async def update_profile(
     profile_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
+    user = await db.get(User, current_user.id)
+    old_hostel = user.hostel
     for field, value in profile_data.dict(exclude_unset=True).items():
-        setattr(current_user, field, value)
-    db.commit()
+        setattr(user, field, value)
+    await move_student_headcounts(db, user.id, old_hostel, user.hostel)
+    await bump_data_versions(db, User.id == user.id)
+    forget_users_after_commit(db, [user.id])
+    await db.commit()
     return {"message": "Profile updated successfully"}
 
 @router.post("/rebate-requests", response_model=RebateRequestSchema)
 async def create_rebate_request(
     request_data: RebateRequestCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
@@ -65,16 +137,26 @@ async def create_rebate_request(
     total_days = calculate_days(request_data.start_date, request_data.end_date)
     if total_days > 30:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Maximum rebate period is 30 days.")
+    await check_new_rebate_request(db, current_user.id, request_data.start_date, request_data.end_date)
     rr = RebateRequest(
         student_id=current_user.id,
         start_date=request_data.start_date,
         end_date=request_data.end_date,
         total_days=total_days,
         reason=request_data.reason,
+        status=RequestStatus.PENDING,
     )
     db.add(rr)
-    db.commit()
-    db.refresh(rr)
+    await record_status_change(db, current_user.id, total_days, None, RequestStatus.PENDING)
+    await record_headcount_changes(
+        db, [(current_user.id, request_data.start_date, request_data.end_date, None, RequestStatus.PENDING)]
+    )
+    await bump_data_versions(db, User.id == current_user.id)
+    # Postgres exclusion constraint may still catch a concurrent overlapping request
+    await commit_rebate_change(db, status.HTTP_400_BAD_REQUEST)
+    await invalidate_dashboard_stats()
+    await db.refresh(rr)
+    await notify_admins("rebate_request.created", request_id=rr.id, student_id=rr.student_id, status=rr.status.value)
     return RebateRequestSchema.from_orm(rr)
 
 @router.post("/rebate-requests/{request_id}/upload-document", response_model=dict)
@@ -82,72 +164,150 @@ async def upload_document(
     request_id: int,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    read_db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
-    rr = db.query(RebateRequest).filter_by(id=request_id, student_id=current_user.id).first()
-    if not rr:
+    # Checked on a read connection: the write session's first statement comes
+    # after the upload is spooled, so a slow upload never holds the writer
+    owned = await read_db.scalar(
+        select(RebateRequest.id).where(RebateRequest.id == request_id, RebateRequest.student_id == current_user.id)
+    )
+    if owned is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rebate request not found.")
-    ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in {".pdf", ".jpg", ".jpeg", ".png"}:
+    await read_db.close()
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in CONTENT_TYPES:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file type.")
-    upload_dir = "uploads/documents"
-    os.makedirs(upload_dir, exist_ok=True)
-    fname = f"{uuid.uuid4()}{ext}"
-    path = os.path.join(upload_dir, fname)
-    with open(path, "wb") as buf:
-        buf.write(await file.read())
-    rr.document_path = path
-    db.commit()
-    return {"message": "Uploaded successfully", "file_path": path}
+
+    upload = await spool_upload(file, settings.UPLOAD_MAX_BYTES)
+    try:
+        # Stored before the write transaction opens, so the writer is never held on storage I/O
+        await store_upload(upload, CONTENT_TYPES[ext])
+        document = await add_document_reference(db, upload, CONTENT_TYPES[ext])
+        rr = await db.get(RebateRequest, request_id)
+        if rr.document_sha256:
+            await release_document_reference(db, rr.document_sha256)
+        rr.document_sha256 = document.sha256
+        rr.document_path = document.storage_key
+        await bump_data_versions(db, User.id == current_user.id)
+        await db.commit()
+    finally:
+        upload.discard()
+    return {"message": "Uploaded successfully", "file_path": document.storage_key}
 
 @router.get("/rebate-requests", response_model=List[RebateRequestSchema])
 async def get_rebate_requests(
+    request: Request,
+    response: Response,
     userId: Optional[int] = Query(None),
+    status_filter: Optional[str] = None,
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role == UserRole.STUDENT:
         target = current_user.id
+        cached = await student_not_modified(request, response, db, target, "rebate-requests")
+        if cached is not None:
+            return cached
     else:
         if userId is not None:
             target = userId
         else:
-            items = db.query(RebateRequest).order_by(RebateRequest.created_at.desc()).all()
-            return [RebateRequestSchema.from_orm(x) for x in items]
+            # Admin view across all students: filtered and keyset-paginated,
+            # next page cursor in the X-Next-Cursor header.
+            query = select(*REBATE_REQUEST_COLUMNS).join(User, RebateRequest.student_id == User.id)
+            query = filter_rebate_requests(
+                query,
+                status_filter=status_filter,
+                hostel=hostel,
+                roll_prefix=roll_prefix,
+                date_from=date_from,
+                date_to=date_to,
+            )
+            rows = await paginate(db, query, RebateRequest.created_at, RebateRequest.id, cursor, limit, response)
+            return json_response(rebate_request_items(rows), response)
 
-    items = (
-        db.query(RebateRequest)
-        .filter(RebateRequest.student_id == target)
-        .order_by(RebateRequest.created_at.desc())
-        .all()
-    )
-    return [RebateRequestSchema.from_orm(x) for x in items]
+    return json_response(rebate_request_items(await _own_rebate_request_rows(db, target)), response)
 
 @router.get("/rebate-summary", response_model=RebateSummary)
 async def get_rebate_summary(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    base = db.query(RebateRequest).filter(RebateRequest.student_id == current_user.id)
-    return RebateSummary(
-        total=base.count(),
-        pending=base.filter(cast(RebateRequest.status, String).ilike("pending")).count(),
-        approved=base.filter(cast(RebateRequest.status, String).ilike("approved")).count(),
-    )
+    cached = await student_not_modified(request, response, db, current_user.id, "rebate-summary")
+    if cached is not None:
+        return cached
+    return await _rebate_summary(db, current_user.id)
 
 @router.get("/mess-bills", response_model=List[MessBillSchema])
 async def get_mess_bills(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
-    bills = (
-        db.query(MessBill)
-        .filter(MessBill.student_id == current_user.id)
+    cached = await student_not_modified(request, response, db, current_user.id, "mess-bills")
+    if cached is not None:
+        return cached
+    bills = (await db.execute(
+        select(MessBill)
+        .where(MessBill.student_id == current_user.id)
         .order_by(MessBill.month.desc())
-        .all()
-    )
+    )).scalars().all()
     return [MessBillSchema.from_orm(b) for b in bills]
+
+@router.get("/home", response_model=dict)
+async def get_student_home(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of profile,summary,rebate_requests,mess_bills"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    The student dashboard in one call: profile, rebate summary, rebate
+    requests and mess bills (or the `fields` subset), from one session. A
+    version lookup answers unchanged reloads with 304; otherwise one query
+    per list, with the summary counted from the request rows when those are
+    fetched anyway. The session's single connection runs statements one at
+    a time, so nothing here is issued concurrently.
+    """
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Students only.")
+    sections = _home_sections(fields)
+    home = {}
+    variant = ".".join(sections)
+    if "profile" in sections:
+        # Comes from the cached user, not the versioned rows, so it is hashed into the ETag
+        home["profile"] = _profile(current_user)
+        variant += "." + payload_hash(home["profile"])[:16]
+    cached = await student_not_modified(request, response, db, current_user.id, "home", variant)
+    if cached is not None:
+        return cached
+
+    if "rebate_requests" in sections:
+        rows = await _own_rebate_request_rows(db, current_user.id)
+        if "summary" in sections:
+            home["summary"] = _summary((r.status, 1, r.total_days) for r in rows).model_dump()
+        home["rebate_requests"] = rebate_request_items(rows)
+    elif "summary" in sections:
+        home["summary"] = (await _rebate_summary(db, current_user.id)).model_dump()
+    if "mess_bills" in sections:
+        home["mess_bills"] = mess_bill_items((await db.execute(
+            select(*MESS_BILL_COLUMNS)
+            .where(MessBill.student_id == current_user.id)
+            .order_by(MessBill.month.desc())
+        )).all())
+    return json_response(home, response)
@@ -1,8 +1,9 @@
 # backend/schemas.py
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, computed_field
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Literal, Optional
 from models import UserRole, RequestStatus
+from services.documents import document_url
 
 # User Schemas
 class UserBase(BaseModel):
@@ -89,9 +90,27 @@ class RebateRequest(RebateRequestBase):
     processed_at: Optional[datetime] = None
     created_at: datetime
 
+    @computed_field
+    @property
+    def document_url(self) -> Optional[str]:
+        return document_url(self.id) if self.document_path else None
+
     class Config:
         from_attributes = True
 
+class BatchDecisionRequest(BaseModel):
+    request_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    decision: Literal["approve", "reject"]
+    reason: Optional[str] = None
+
+class BatchDecisionItem(BaseModel):
+    id: int
+    result: Literal["updated", "unchanged", "conflict", "not_found"]
+
+class BatchDecisionResponse(BaseModel):
+    updated: int
+    results: List[BatchDecisionItem]
+
 # Mess Bill Schemas
 class MessBillBase(BaseModel):
     month: str
@@ -117,6 +136,8 @@ class RebateSummary(BaseModel):
     total: int
     pending: int
     approved: int
+    rejected: int = 0
+    approved_days: int = 0
 
     class Config:
         from_attributes = True
@@ -0,0 +1,61 @@
+"""
+Move documents uploaded before content-addressed storage (rebate requests
+with a document_path on disk but no document_sha256) into storage and
+stored_documents, so /api/documents can serve them. Run once from the
+backend directory, where the old relative paths resolve:
+
+    python -m scripts.backfill_documents
+
+Safe to re-run; the original files are left in place.
+"""
+import asyncio
+import hashlib
+import os
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from database import AsyncWriteSessionLocal, write_engine
+from models import RebateRequest
+from services.documents import CONTENT_TYPES, add_document_reference, store_upload
+from services.storage import UPLOAD_CHUNK_SIZE, SpooledUpload
+
+def _hash_file(path: str) -> SpooledUpload:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return SpooledUpload(path=path, sha256=digest.hexdigest(), size=os.path.getsize(path))
+
+async def run():
+    migrated = missing = 0
+    try:
+        async with AsyncWriteSessionLocal() as db:
+            requests = (await db.execute(
+                select(RebateRequest)
+                .where(RebateRequest.document_path.isnot(None), RebateRequest.document_sha256.is_(None))
+                .order_by(RebateRequest.id)
+            )).scalars().all()
+            for rr in requests:
+                if not os.path.isfile(rr.document_path):
+                    print(f"⚠️ Request {rr.id}: {rr.document_path} not found, skipped")
+                    missing += 1
+                    continue
+                content_type = CONTENT_TYPES.get(os.path.splitext(rr.document_path)[1].lower(), "application/octet-stream")
+                upload = await run_in_threadpool(_hash_file, rr.document_path)
+                await store_upload(upload, content_type)
+                document = await add_document_reference(db, upload, content_type)
+                rr.document_sha256 = document.sha256
+                rr.document_path = document.storage_key
+                await db.commit()
+                migrated += 1
+    finally:
+        await write_engine.dispose()
+    return migrated, missing
+
+def main():
+    migrated, missing = asyncio.run(run())
+    print(f"Backfilled {migrated} legacy documents ({missing} missing on disk)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Per-row cost of serializing large list responses, comparing the FastAPI
+response_model path the list endpoints used to take with the orjson fast
+path in services.serialization. No database needed; from the backend
+directory:
+
+    python -m scripts.bench_serialization --rows 50000 --repeat 5
+    python -m scripts.bench_serialization --output bench/serialization.json
+
+Rows are synthetic but shaped like the real SQL projections. "before" is
+schema construction (admin: dict formatting) + response_model validation +
+jsonable_encoder + json.dumps; "after" is dict-from-tuple + orjson.dumps.
+Both sides produce the same JSON, which is checked before timing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import RequestStatus
+from routers.admin import _format_rebate_request_row
+from schemas import RebateRequest as RebateRequestSchema
+from services.documents import document_url, thumbnail_url
+from services.serialization import REBATE_REQUEST_COLUMNS, rebate_request_items
+
+AdminRow = namedtuple(
+    "AdminRow", [c.key for c in REBATE_REQUEST_COLUMNS] + ["student_name", "student_roll_number"]
+)
+
+def _rows(count: int, seed: int) -> List[AdminRow]:
+    rng = random.Random(seed)
+    statuses = list(RequestStatus)
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(count, 0, -1):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        days = rng.randint(3, 7)
+        status = rng.choice(statuses)
+        decided = status != RequestStatus.PENDING
+        rows.append(AdminRow(
+            start_date=start,
+            end_date=start + timedelta(days=days - 1),
+            reason=rng.choice(["Going home", "Medical leave", "Internship travel", "Family function"]),
+            id=i,
+            student_id=rng.randrange(1, 5000),
+            total_days=days,
+            status=status,
+            document_path=f"{i % 256:02x}/{i:064x}" if rng.random() < 0.3 else None,
+            admin_remarks="Insufficient documentation" if status == RequestStatus.REJECTED else None,
+            processed_by=1 if decided else None,
+            processed_at=now + timedelta(seconds=i, microseconds=rng.randrange(1_000_000)) if decided else None,
+            created_at=now - timedelta(seconds=i, microseconds=rng.randrange(1_000_000)),
+            student_name=f"Student {i}",
+            student_roll_number=f"{200000 + i}",
+        ))
+    return rows
+
+def _legacy_admin_row(row) -> dict:
+    """The admin formatter as it was before the orjson fast path."""
+    return {
+        "id": row.id,
+        "name": row.student_name or "Unknown",
+        "roll_no": row.student_roll_number or "Unknown",
+        "from_date": row.start_date.isoformat(),
+        "to_date": row.end_date.isoformat(),
+        "reason": row.reason,
+        "status": row.status.value.title(),
+        "submitted_on": row.created_at.strftime("%Y-%m-%d"),
+        "document_url": document_url(row.id) if row.document_path else None,
+        "thumbnail_url": thumbnail_url(row.id) if row.document_path else None,
+        "rejection_reason": row.admin_remarks if row.status == RequestStatus.REJECTED else None,
+        "total_days": row.total_days,
+        "student_id": row.student_id,
+        "processed_at": row.processed_at.isoformat() if row.processed_at else None,
+        "processed_by": row.processed_by,
+    }
+
+def _response_model_body(response_model, content) -> bytes:
+    """What FastAPI does with a handler's return value when response_model is set."""
+    field = create_response_field(name="Response", type_=response_model, mode="serialization")
+    value = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(value).body
+
+def _cases(rows: List[AdminRow]) -> dict:
+    student_rows = [tuple(r)[:len(REBATE_REQUEST_COLUMNS)] for r in rows]
+    return {
+        "student_rebate_requests": {
+            "before": lambda: _response_model_body(
+                List[RebateRequestSchema], [RebateRequestSchema.model_validate(r) for r in rows]
+            ),
+            "after": lambda: ORJSONResponse(rebate_request_items(student_rows)).body,
+        },
+        "admin_rebate_requests": {
+            "before": lambda: _response_model_body(List[dict], [_legacy_admin_row(r) for r in rows]),
+            "after": lambda: ORJSONResponse([_format_rebate_request_row(r) for r in rows]).body,
+        },
+    }
+
+def _best_of(fn: Callable[[], bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run(args) -> dict:
+    rows = _rows(args.rows, args.seed)
+    results = {}
+    for name, case in _cases(rows).items():
+        if json.loads(case["before"]()) != json.loads(case["after"]()):
+            raise SystemExit(f"{name}: fast path output differs from the response_model path")
+        before = _best_of(case["before"], args.repeat)
+        after = _best_of(case["after"], args.repeat)
+        results[name] = {
+            "before_ms": round(before * 1000, 2),
+            "after_ms": round(after * 1000, 2),
+            "before_us_per_row": round(before * 1e6 / args.rows, 3),
+            "after_us_per_row": round(after * 1e6 / args.rows, 3),
+            "speedup": round(before / after, 2) if after else None,
+        }
+        r = results[name]
+        print(f"{name:<26} before {r['before_us_per_row']:>8} µs/row  after {r['after_us_per_row']:>8} µs/row  "
+              f"({r['before_ms']} ms → {r['after_ms']} ms, {r['speedup']}x)")
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "rows": args.rows,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "cases": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list response serialization")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5, help="best of N timings per path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write results as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Concurrency benchmark for the SQLite profile: the same mixed read/write
+workload against a fresh database with SQLITE_TUNED off (driver defaults:
+rollback journal, a connection per request, deferred transactions) and on
+(WAL + pragmas, a read pool and the single writer). From the backend
+directory:
+
+    python -m scripts.bench_sqlite --operations 2000 --concurrency 32
+    python -m scripts.bench_sqlite --write-ratio 0.5 --output bench/sqlite-modes.json
+
+Each mode runs in its own process (database.py reads the settings at
+import) over in-process ASGI, like scripts.benchmark. Reads are the student
+home and admin request list; writes are admin approve/reject and student
+profile updates. Errors are 5xx responses, typically "database is locked".
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+MODES = ("legacy", "tuned")
+
+def _worker(args) -> dict:
+    import httpx
+    from sqlalchemy import select
+
+    from database import Base, SessionLocal, engine
+    from models import User, UserRole, RebateRequest
+    from scripts.benchmark import percentile
+    from scripts.seed_data import seed, EMAIL_DOMAIN
+    from services.auth_service import create_user_token
+    from services.headcount import rebuild_hostel_headcounts
+    from services.rebate_stats import rebuild_student_rebate_stats
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed(db, args.students, args.requests, 4, random.Random(args.seed))
+        rebuild_student_rebate_stats(db)
+        rebuild_hostel_headcounts(db)
+        admin = db.execute(select(User).where(User.role == UserRole.ADMIN)).scalars().first()
+        students = db.execute(select(User).where(User.email.like(f"%@{EMAIL_DOMAIN}"))).scalars().all()
+        request_ids = db.execute(select(RebateRequest.id)).scalars().all()
+        admin_headers = {"Authorization": f"Bearer {create_user_token(admin)}"}
+        student_headers = [{"Authorization": f"Bearer {create_user_token(s)}"} for s in students]
+    finally:
+        db.close()
+
+    from main import app
+
+    def operation(rng: random.Random):
+        if rng.random() < args.write_ratio:
+            if rng.random() < 0.7:
+                action = rng.choice(("approve", "reject"))
+                return "POST", f"/api/admin/requests/{rng.choice(request_ids)}/{action}", admin_headers, {"reason": "Benchmark"}
+            return "PUT", "/api/students/profile", rng.choice(student_headers), {"room_number": str(rng.randrange(100, 500))}
+        if rng.random() < 0.7:
+            return "GET", "/api/students/home", rng.choice(student_headers), None
+        return "GET", "/api/admin/rebate-requests?limit=50", admin_headers, None
+
+    async def run():
+        latencies = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        remaining = iter(range(args.operations))
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            async def worker(worker_id: int):
+                rng = random.Random(f"{args.seed}-{worker_id}")
+                for _ in remaining:
+                    method, url, headers, body = operation(rng)
+                    kind = "read" if method == "GET" else "write"
+                    start = time.perf_counter()
+                    response = await client.request(method, url, headers=headers, json=body)
+                    latencies[kind].append(time.perf_counter() - start)
+                    if response.status_code >= 500:
+                        errors[kind] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+            return time.perf_counter() - started, latencies, errors
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed, latencies, errors = asyncio.run(run())
+
+    ms = lambda seconds: round(seconds * 1000, 3)
+    result = {"throughput_ops": round(args.operations / elapsed, 2), "elapsed_s": round(elapsed, 3)}
+    for kind, values in latencies.items():
+        values.sort()
+        result[kind] = {
+            "operations": len(values),
+            "errors": errors[kind],
+            "p50_ms": ms(percentile(values, 50)),
+            "p95_ms": ms(percentile(values, 95)),
+            "p99_ms": ms(percentile(values, 99)),
+        }
+    return result
+
+def _run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            SQLITE_TUNED="true" if mode == "tuned" else "false",
+            OTP_PURGE_INTERVAL_SECONDS="0",
+            SQL_PROFILING_ENABLED="false",
+        )
+        command = [
+            sys.executable, "-m", "scripts.bench_sqlite", "--worker",
+            "--operations", str(args.operations), "--concurrency", str(args.concurrency),
+            "--write-ratio", str(args.write_ratio), "--students", str(args.students),
+            "--requests", str(args.requests), "--seed", str(args.seed),
+        ]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise SystemExit(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite modes under concurrent reads and writes")
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write results as JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args)))
+        return
+
+    results = {}
+    for mode in MODES:
+        r = results[mode] = _run_mode(mode, args)
+        print(f"{mode:<8} {r['throughput_ops']:>9} ops/s  "
+              f"read p95 {r['read']['p95_ms']:>9} ms  write p95 {r['write']['p95_ms']:>9} ms  "
+              f"errors {r['read']['errors'] + r['write']['errors']}")
+    legacy, tuned = results["legacy"]["throughput_ops"], results["tuned"]["throughput_ops"]
+    print(f"throughput gain: {round(tuned / legacy, 2) if legacy else None}x")
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "python": platform.python_version(),
+                "operations": args.operations,
+                "concurrency": args.concurrency,
+                "write_ratio": args.write_ratio,
+                "seed": args.seed,
+            },
+            "modes": results,
+        }
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Concurrent load driver for the hot API endpoints. Seed first
+(python -m scripts.seed_data), then from the backend directory:
+
+    python -m scripts.benchmark --requests 500 --concurrency 20 --output bench/sqlite.json
+    DATABASE_URL=postgresql://... python -m scripts.benchmark --output bench/postgres.json
+    python -m scripts.benchmark --baseline bench/previous.json --output bench/current.json
+
+By default the app is driven in-process over ASGI against DATABASE_URL, which
+also counts SQL statements per request; --base-url targets a running server
+instead (no query counts). Each endpoint gets --requests calls from
+--concurrency workers; p50/p95/p99 latency, throughput and queries per request
+are written as JSON so runs can be diffed between releases.
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Login issues OTPs; lift the per-email throttle so it measures the handler, not the 429 path
+os.environ.setdefault("OTP_RATE_LIMIT_BURST", "1000000")
+
+import httpx
+from sqlalchemy import event, select
+
+from config import settings
+from database import SessionLocal, async_engine, write_engine
+from models import User, UserRole
+from scripts.seed_data import EMAIL_DOMAIN
+from services.auth_service import create_user_token
+
+_query_counter: contextvars.ContextVar = contextvars.ContextVar("benchmark_query_counter", default=None)
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+class Endpoint:
+    def __init__(self, name: str, method: str, build: Callable[[random.Random], dict]):
+        self.name = name
+        self.method = method
+        self.build = build      # rng -> {"url", "headers", "json"?}
+
+def _endpoints(admin_token: str, students: List[tuple]) -> Dict[str, Endpoint]:
+    admin = {"Authorization": f"Bearer {admin_token}"}
+
+    def login(rng):
+        email, roll, _ = rng.choice(students)
+        return {"url": "/api/auth/login", "json": {"email": email, "roll_number": roll}}
+
+    def student_requests(rng):
+        _, _, token = rng.choice(students)
+        return {"url": "/api/students/rebate-requests", "headers": {"Authorization": f"Bearer {token}"}}
+
+    return {
+        e.name: e for e in (
+            Endpoint("auth_login", "POST", login),
+            Endpoint("student_rebate_requests", "GET", student_requests),
+            Endpoint("admin_students", "GET", lambda rng: {"url": "/api/admin/students", "headers": admin}),
+            Endpoint("admin_rebate_requests", "GET", lambda rng: {"url": "/api/admin/rebate-requests", "headers": admin}),
+            Endpoint("admin_dashboard_stats", "GET", lambda rng: {"url": "/api/admin/dashboard-stats", "headers": admin}),
+        )
+    }
+
+def _load_identities(sample: int, rng: random.Random):
+    db = SessionLocal()
+    try:
+        admin = db.execute(select(User).where(User.role == UserRole.ADMIN).limit(1)).scalars().first()
+        students = db.execute(
+            select(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")).order_by(User.id)
+        ).scalars().all()
+    finally:
+        db.close()
+    if admin is None or not students:
+        raise SystemExit("No seeded data found; run `python -m scripts.seed_data` first.")
+    students = rng.sample(students, min(sample, len(students)))
+    return create_user_token(admin), [(s.email, s.roll_number, create_user_token(s)) for s in students]
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+async def _run_endpoint(client: httpx.AsyncClient, endpoint: Endpoint, total: int, concurrency: int, seed: int) -> dict:
+    latencies, queries, errors = [], [], 0
+    remaining = iter(range(total))
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        rng = random.Random(f"{seed}-{endpoint.name}-{worker_id}")
+        for _ in remaining:
+            spec = endpoint.build(rng)
+            counter = [0]
+            token = _query_counter.set(counter)
+            start = time.perf_counter()
+            try:
+                response = await client.request(endpoint.method, spec["url"], headers=spec.get("headers"), json=spec.get("json"))
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            finally:
+                latencies.append(time.perf_counter() - start)
+                queries.append(counter[0])
+                _query_counter.reset(token)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else 0.0,
+    }
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _compare(baseline: dict, current: dict):
+    print(f"\n{'endpoint':<26}{'p95 ms (was)':>22}{'rps (was)':>22}")
+    for name, result in current["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        was = lambda key: f" ({old[key]})" if old else ""
+        print(f"{name:<26}{str(result['p95_ms']) + was('p95_ms'):>22}{str(result['throughput_rps']) + was('throughput_rps'):>22}")
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    admin_token, students = _load_identities(args.students, rng)
+    endpoints = _endpoints(admin_token, students)
+    selected = args.endpoints or list(endpoints)
+    unknown = set(selected) - set(endpoints)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))} (choose from {', '.join(endpoints)})")
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        count_queries = False
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout)
+        for target in {async_engine.sync_engine, write_engine.sync_engine}:
+            event.listen(target, "before_cursor_execute", _count_query)
+        count_queries = True
+
+    results = {}
+    async with client:
+        for name in selected:
+            # Handlers print OTPs and similar to stdout; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                if args.warmup:
+                    await _run_endpoint(client, endpoints[name], args.warmup, args.concurrency, args.seed + 1)
+                result = await _run_endpoint(client, endpoints[name], args.requests, args.concurrency, args.seed)
+            if not count_queries:
+                result["queries_per_request"] = None
+            results[name] = result
+            print(f"{name:<26} p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+                  f"p99 {result['p99_ms']:>8} ms  {result['throughput_rps']:>8} req/s  "
+                  f"{result['queries_per_request']} q/req  {result['errors']} errors")
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "database": async_engine.dialect.name if not args.base_url else None,
+            "seed": args.seed,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "cache_url": bool(settings.CACHE_URL),
+        },
+        "endpoints": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rebate portal API")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint")
+    parser.add_argument("--students", type=int, default=200, help="seeded students to act as")
+    parser.add_argument("--endpoints", nargs="*", help="subset of endpoint names to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            _compare(json.load(fh), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Delete used and expired OTPs in batches. Run from the backend directory
+(e.g. from cron when the in-process purge job is disabled):
+
+    python -m scripts.purge_otps
+"""
+import asyncio
+
+from database import AsyncWriteSessionLocal, write_engine
+from services.otp import purge_otps
+
+async def run() -> int:
+    try:
+        async with AsyncWriteSessionLocal() as db:
+            return await purge_otps(db)
+    finally:
+        await write_engine.dispose()
+
+def main():
+    deleted = asyncio.run(run())
+    print(f"Purged {deleted} used/expired OTPs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Rebuild the student_rebate_stats table, users.total_rebate_days and the
+hostel_daily_headcounts rollup from rebate_requests. Run from the backend
+directory:
+
+    python -m scripts.rebuild_rebate_stats
+"""
+from database import SessionLocal
+from services.rebate_stats import rebuild_student_rebate_stats
+from services.headcount import rebuild_hostel_headcounts
+
+def main():
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_student_rebate_stats(db)
+        days = rebuild_hostel_headcounts(db)
+    finally:
+        db.close()
+    print(f"Rebuilt rebate stats for {rebuilt} students and {days} hostel headcount days")
+
+if __name__ == "__main__":
+    main()
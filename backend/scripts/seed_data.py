@@ -0,0 +1,145 @@
+"""
+Seed a database with synthetic students and rebate requests for load
+testing. Run from the backend directory against the DATABASE_URL you want
+to fill:
+
+    python -m scripts.seed_data --students 5000 --requests 40000 --seed 42
+
+Seeded users have emails under @loadtest.hall6.ac.in; --clear removes them
+(and their requests) first. Output is deterministic for a given --seed.
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, insert, delete
+
+from database import SessionLocal, engine, Base
+from models import User, UserRole, RebateRequest, RequestStatus, StudentRebateStats
+from services.rebate_stats import rebuild_student_rebate_stats
+from services.headcount import rebuild_hostel_headcounts
+
+EMAIL_DOMAIN = "loadtest.hall6.ac.in"
+ADMIN_EMAIL = "warden@hall6.ac.in"
+HOSTELS = [f"Hall {n}" for n in range(1, 13)]
+STATUS_WEIGHTS = {RequestStatus.PENDING: 3, RequestStatus.APPROVED: 5, RequestStatus.REJECTED: 2}
+INSERT_BATCH_SIZE = 5000
+SLOT_DAYS = 9               # longest seeded request is 7 days
+SLOTS_PER_SEMESTER = 20     # 20 × 9 days fits the shortest (181-day) semester
+
+def student_email(index: int) -> str:
+    return f"student{index:06d}@{EMAIL_DOMAIN}"
+
+def _batches(rows, size=INSERT_BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _semester_windows(today: date, count: int):
+    """(start, end) of the `count` most recent Jan–Jun / Jul–Dec semesters, oldest first."""
+    windows = []
+    year, first_half = today.year, today.month <= 6
+    for _ in range(count):
+        if first_half:
+            windows.append((date(year, 1, 1), date(year, 6, 30)))
+            year -= 1
+        else:
+            windows.append((date(year, 7, 1), date(year, 12, 31)))
+        first_half = not first_half
+    return list(reversed(windows))
+
+def clear_seeded(db):
+    ids = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+    db.execute(delete(RebateRequest).where(RebateRequest.student_id.in_(ids)))
+    db.execute(delete(StudentRebateStats).where(StudentRebateStats.student_id.in_(ids)))
+    db.execute(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+    db.commit()
+
+def seed(db, students: int, requests: int, semesters: int, rng: random.Random):
+    now = datetime.utcnow()
+    user_rows = [
+        {
+            "email": student_email(i),
+            "roll_number": f"LT{i:06d}",
+            "name": f"Load Test {i}",
+            "hostel": HOSTELS[i % len(HOSTELS)],
+            "room_number": str(100 + i % 400),
+            "role": UserRole.STUDENT,
+            "is_active": True,
+            "is_verified": True,
+            "total_rebate_days": 0,
+            "created_at": now - timedelta(seconds=students - i),
+            "updated_at": now,
+        }
+        for i in range(students)
+    ]
+    for batch in _batches(user_rows):
+        db.execute(insert(User), batch)
+
+    if db.execute(select(User.id).where(User.email == ADMIN_EMAIL)).first() is None:
+        db.execute(insert(User), [{
+            "email": ADMIN_EMAIL, "name": "Admin", "role": UserRole.ADMIN,
+            "is_active": True, "is_verified": True, "total_rebate_days": 0,
+            "created_at": now, "updated_at": now,
+        }])
+
+    student_ids = db.execute(
+        select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}")).order_by(User.email)
+    ).scalars().all()
+
+    # Spread requests over students. Each semester is cut into 9-day slots
+    # and a student's requests take distinct slots, so none overlap (as the
+    # API would enforce).
+    per_student = [0] * len(student_ids)
+    for _ in range(requests):
+        per_student[rng.randrange(len(student_ids))] += 1
+
+    windows = _semester_windows(now.date(), semesters)
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    request_rows = []
+    for student_id, count in zip(student_ids, per_student):
+        for slot in rng.sample(range(semesters * SLOTS_PER_SEMESTER), min(count, semesters * SLOTS_PER_SEMESTER)):
+            lo, _ = windows[slot // SLOTS_PER_SEMESTER]
+            start = lo + timedelta(days=(slot % SLOTS_PER_SEMESTER) * SLOT_DAYS)
+            days = rng.randint(1, 7)
+            status = rng.choices(statuses, weights)[0]
+            created = datetime.combine(start, datetime.min.time()) - timedelta(days=rng.randint(1, 20))
+            request_rows.append({
+                "student_id": student_id,
+                "start_date": start,
+                "end_date": start + timedelta(days=days - 1),
+                "total_days": days,
+                "reason": "Load test",
+                "status": status,
+                "admin_remarks": "Load test" if status == RequestStatus.REJECTED else None,
+                "processed_at": created + timedelta(days=1) if status != RequestStatus.PENDING else None,
+                "created_at": created,
+                "updated_at": created,
+            })
+    for batch in _batches(request_rows):
+        db.execute(insert(RebateRequest), batch)
+    db.commit()
+    return len(student_ids), len(request_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=8000)
+    parser.add_argument("--semesters", type=int, default=4, help="how many recent semesters requests fall in")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--clear", action="store_true", help="remove previously seeded data first")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.clear:
+            clear_seeded(db)
+        students, requests = seed(db, args.students, args.requests, args.semesters, random.Random(args.seed))
+        rebuild_student_rebate_stats(db)
+        rebuild_hostel_headcounts(db)
+    finally:
+        db.close()
+    print(f"Seeded {students} students and {requests} rebate requests")
+
+if __name__ == "__main__":
+    main()
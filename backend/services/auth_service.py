@@ -1,14 +1,144 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 
-from database import get_db
-from models import User
+from database import get_async_db
+from models import User, UserRole
 from config import settings
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Session.info key holding user ids whose cached snapshot must go once the transaction commits
+_STALE_USERS_KEY = "auth_stale_user_ids"
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of a users row; attribute-compatible with User for the read paths."""
+    id: int
+    email: str
+    roll_number: Optional[str]
+    name: Optional[str]
+    phone: Optional[str]
+    hostel: Optional[str]
+    room_number: Optional[str]
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+    total_rebate_days: int
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            roll_number=user.roll_number,
+            name=user.name,
+            phone=user.phone,
+            hostel=user.hostel,
+            room_number=user.room_number,
+            role=user.role,
+            is_active=bool(user.is_active),
+            is_verified=bool(user.is_verified),
+            total_rebate_days=user.total_rebate_days or 0,
+            created_at=user.created_at,
+        )
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """Identity carried inside the access token itself."""
+    email: str
+    id: int
+    role: UserRole
+    is_verified: bool
+
+class UserSnapshotCache:
+    """
+    Per-process LRU of UserSnapshot keyed by token subject (email), bounded
+    to `maxsize` entries and `ttl` seconds. Each worker keeps its own copy,
+    so a change made on another worker is visible here after at most `ttl`.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._subject_by_id = {}
+
+    def get(self, subject: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._data.get(subject)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= time.monotonic():
+                self._drop(subject)
+                return None
+            self._data.move_to_end(subject)
+            return snapshot
+
+    def set(self, subject: str, snapshot: UserSnapshot):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[subject] = (time.monotonic() + self.ttl, snapshot)
+            self._data.move_to_end(subject)
+            self._subject_by_id[snapshot.id] = subject
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def forget(self, subject: str):
+        with self._lock:
+            self._drop(subject)
+
+    def forget_ids(self, user_ids: Iterable[int]):
+        with self._lock:
+            for user_id in user_ids:
+                subject = self._subject_by_id.get(user_id)
+                if subject is not None:
+                    self._drop(subject)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._subject_by_id.clear()
+
+    def _drop(self, subject: str):
+        entry = self._data.pop(subject, None)
+        if entry is not None:
+            self._subject_by_id.pop(entry[1].id, None)
+
+user_cache = UserSnapshotCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+def forget_users_after_commit(db: AsyncSession, user_ids: Iterable[int]):
+    """
+    Drop the users' cached snapshots once `db` commits. Dropping them before
+    the commit would let a concurrent request re-cache the old row.
+    """
+    db.sync_session.info.setdefault(_STALE_USERS_KEY, set()).update(user_ids)
+
+@event.listens_for(Session, "after_commit")
+def _forget_stale_users(session):
+    stale = session.info.pop(_STALE_USERS_KEY, None)
+    if stale:
+        user_cache.forget_ids(stale)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_users(session):
+    session.info.pop(_STALE_USERS_KEY, None)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create JWT access token"""
@@ -17,32 +147,102 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
+
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """Get current user from JWT token"""
-    credentials_exception = HTTPException(
+def create_user_token(user: User) -> str:
+    """Access token for `user`, with id, role and verification carried as claims."""
+    return create_access_token(data={
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.value,
+        "verified": bool(user.is_verified),
+    })
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _decode(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+async def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenClaims:
+    """
+    Identity from the token claims alone — no cache or database access.
+    Tokens issued before claims were added are rejected (clients log in again).
+    """
+    return claims_from_token(credentials.credentials)
+
+async def get_token_claims_or_query(
+    access_token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> TokenClaims:
+    """
+    get_token_claims that also accepts the token as ?access_token=, for
+    clients that cannot set headers (EventSource, <iframe>, <img>).
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims_from_token(token)
+
+def claims_from_token(token: str) -> TokenClaims:
+    """get_token_claims for a raw token (e.g. one passed as a query parameter)."""
+    payload = _decode(token)
+    try:
+        return TokenClaims(
+            email=payload["sub"],
+            id=int(payload["uid"]),
+            role=UserRole(payload["role"]),
+            is_verified=bool(payload.get("verified", False)),
+        )
+    except (KeyError, TypeError, ValueError):
+        raise _credentials_exception()
+
+def verify_metrics_access(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Guard for /metrics: the METRICS_TOKEN bearer (for the scraper) or an
+    admin access token. Decided without touching the database.
+    """
+    token = credentials.credentials
+    if settings.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    if claims_from_token(token).role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied. Admin privileges required.")
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
+    """
+    Get current user from JWT token. Returns a cached UserSnapshot; handlers
+    that modify the user must load the row themselves.
+    """
+    email = _decode(credentials.credentials)["sub"]
+
+    snapshot = user_cache.get(email)
+    if snapshot is not None:
+        return snapshot
+
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if user is None:
-        raise credentials_exception
-    
-    return user
+        raise _credentials_exception()
+
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(email, snapshot)
+    return snapshot
@@ -0,0 +1,113 @@
+import calendar
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import UPSERT_INSERTS
+from models import User, UserRole, RebateRequest, RequestStatus, MessBill
+from services.conditional import bump_data_versions
+
+CENTS = Decimal("0.01")
+
+def billing_month(year: int, month: int) -> str:
+    """MessBill.month key (YYYY-MM)."""
+    return f"{year:04d}-{month:02d}"
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+async def approved_rebate_days(db: AsyncSession, year: int, month: int) -> dict:
+    """
+    Approved rebate days per student, with each request clipped to the month.
+    One range query over the requests overlapping the month.
+    """
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    rows = (await db.execute(
+        select(RebateRequest.student_id, RebateRequest.start_date, RebateRequest.end_date)
+        .where(
+            RebateRequest.status == RequestStatus.APPROVED,
+            RebateRequest.start_date <= last,
+            RebateRequest.end_date >= first,
+        )
+    )).all()
+
+    days = defaultdict(int)
+    for student_id, start, end in rows:
+        days[student_id] += (min(end, last) - max(start, first)).days + 1
+    return days
+
+async def generate_month_bills(db: AsyncSession, year: int, month: int, rate_per_day: Decimal) -> dict:
+    """
+    Compute every active student's bill for the month and write them with a
+    single multi-row INSERT … ON CONFLICT (student_id, month) DO UPDATE.
+    Re-running for the same month recomputes in place; bills already marked
+    paid are left as they are.
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    month_key = billing_month(year, month)
+    rate = Decimal(str(rate_per_day))
+    total_amount = _money(rate * days_in_month)
+
+    student_ids = (await db.execute(
+        select(User.id).where(User.role == UserRole.STUDENT, User.is_active == True)
+    )).scalars().all()
+    rebate_days = await approved_rebate_days(db, year, month)
+
+    now = datetime.utcnow()
+    rows = []
+    for student_id in student_ids:
+        days = min(rebate_days.get(student_id, 0), days_in_month)
+        rebate_amount = _money(rate * days)
+        rows.append({
+            "student_id": student_id,
+            "month": month_key,
+            "total_amount": total_amount,
+            "rebate_amount": rebate_amount,
+            "final_amount": total_amount - rebate_amount,
+            "is_paid": False,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    if rows:
+        stmt = UPSERT_INSERTS[db.bind.dialect.name](MessBill)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MessBill.student_id, MessBill.month],
+            set_={
+                "total_amount": stmt.excluded.total_amount,
+                "rebate_amount": stmt.excluded.rebate_amount,
+                "final_amount": stmt.excluded.final_amount,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=MessBill.is_paid == False,
+        )
+        await db.execute(stmt, rows)
+        await bump_data_versions(db, and_(User.role == UserRole.STUDENT, User.is_active == True))
+    await db.commit()
+
+    return {
+        "month": month_key,
+        "bills": len(rows),
+        "students_with_rebate": sum(1 for sid in student_ids if rebate_days.get(sid)),
+        "rate_per_day": float(rate),
+        "days_in_month": days_in_month,
+    }
+
+async def billing_history(db: AsyncSession) -> list:
+    """One row per billed month, newest first."""
+    rows = (await db.execute(
+        select(
+            MessBill.month,
+            func.count(MessBill.id).label("bill_count"),
+            func.coalesce(func.sum(MessBill.final_amount), 0).label("total_amount"),
+            func.coalesce(func.sum(MessBill.rebate_amount), 0).label("rebate_amount"),
+            func.max(MessBill.updated_at).label("generated_on"),
+        )
+        .group_by(MessBill.month)
+        .order_by(MessBill.month.desc())
+    )).all()
+    return rows
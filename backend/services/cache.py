@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+
+class InMemoryCache:
+    """Per-process TTL cache. Default backend; each uvicorn worker keeps its own copy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[float, str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+class RedisCache:
+    """
+    Shared backend for multi-worker deployments. Accepts any client with the
+    redis.asyncio get / set(ex=) / delete interface.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self._client.set(key, value, ex=ttl)
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+def _build_cache():
+    if not settings.CACHE_URL:
+        return InMemoryCache()
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+    return RedisCache(redis.from_url(settings.CACHE_URL))
+
+cache = _build_cache()
+
+async def get_json(key: str) -> Optional[Any]:
+    value = await cache.get(key)
+    return json.loads(value) if value is not None else None
+
+async def set_json(key: str, value: Any, ttl: int):
+    await cache.set(key, json.dumps(value), ttl)
@@ -0,0 +1,94 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+import orjson
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import User
+from services.delivery import etag_matches
+
+# Browsers keep the copy but revalidate it on every use
+STUDENT_CACHE_CONTROL = "private, no-cache"
+
+async def bump_data_versions(db: AsyncSession, condition):
+    """
+    Invalidate the cached reads of the users matched by `condition` (e.g.
+    `User.id == student_id`) inside the caller's transaction. Called by
+    every write to a student's profile, rebate requests or mess bills.
+    """
+    await db.execute(
+        update(User)
+        .where(condition)
+        .values(data_version=User.data_version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def _unmodified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    304 when the client's copy is current (If-None-Match, else
+    If-Modified-Since). Otherwise puts the validators on `response` and
+    returns None so the handler builds the body.
+    """
+    headers = {"etag": etag, "cache-control": STUDENT_CACHE_CONTROL}
+    if last_modified is not None:
+        headers["last-modified"] = _http_date(last_modified)
+    if "if-none-match" in request.headers:
+        fresh = etag_matches(request, etag)
+    else:
+        fresh = _unmodified_since(request, last_modified)
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def student_not_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    student_id: int,
+    resource: str,
+    variant: str = "",
+) -> Optional[Response]:
+    """
+    Conditional GET for one of a student's own read endpoints, validated by
+    their data_version with a single primary-key lookup. `variant` folds in
+    anything else the body depends on (e.g. the selected fields).
+    """
+    row = (await db.execute(
+        select(User.data_version, User.updated_at).where(User.id == student_id)
+    )).first()
+    if row is None:
+        return None
+    etag = f'"{resource}-{student_id}-{row.data_version}{"-" + variant if variant else ""}"'
+    return conditional_response(request, response, etag, row.updated_at)
+
+def payload_hash(payload) -> str:
+    return hashlib.sha1(orjson.dumps(payload)).hexdigest()
+
+def payload_etag(payload) -> str:
+    """ETag for a body already in hand (no lookup needed to validate it)."""
+    return f'"{payload_hash(payload)}"'
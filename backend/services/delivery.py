@@ -0,0 +1,121 @@
+import os
+from typing import Optional, Tuple
+
+from fastapi import Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+FILE_CHUNK_SIZE = 64 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+def etag_for(sha256: str, variant: str = "") -> str:
+    """Strong ETag for content-addressed bytes."""
+    return f'"{sha256}{"-" + variant if variant else ""}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"etag": etag, "cache-control": cache_control})
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a single `bytes=` range to an inclusive (start, end) pair.
+    Returns None to serve the whole file (no header, a malformed header or a
+    multi-range request) and raises ValueError for a range that cannot be
+    satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+class FileRangeResponse(Response):
+    """
+    Sends `count` bytes of a file from `offset`. Uses the ASGI zero-copy
+    send extension (sendfile) when the server offers it, and otherwise reads
+    FILE_CHUNK_SIZE chunks in the threadpool.
+    """
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.headers["content-length"] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        fh = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": fh,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+            await run_in_threadpool(fh.seek, self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await run_in_threadpool(fh.read, min(FILE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await run_in_threadpool(fh.close)
+
+def file_response(request: Request, path: str, media_type: str, etag: str, cache_control: str) -> Response:
+    """
+    Serve a local file with ETag/If-None-Match revalidation and single-range
+    support (206 / 416).
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    headers = {"etag": etag, "cache-control": cache_control, "accept-ranges": "bytes"}
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "content-range": f"bytes */{size}"},
+        )
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size, status.HTTP_200_OK, headers, media_type)
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(path, start, end - start + 1, status.HTTP_206_PARTIAL_CONTENT, headers, media_type)
@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import case, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncWriteSessionLocal, UPSERT_INSERTS
+from models import StoredDocument
+from services.previews import delete_thumbnails
+from services.storage import SpooledUpload, content_key, storage
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+}
+
+def document_url(request_id: int) -> str:
+    """API path serving a rebate request's document (routers/documents.py)."""
+    return f"/api/documents/rebate-requests/{request_id}"
+
+def thumbnail_url(request_id: int) -> str:
+    return f"/api/documents/rebate-requests/{request_id}/thumbnail"
+
+async def store_upload(upload: SpooledUpload, content_type: str) -> str:
+    """
+    Put the upload's content in storage unless a copy is already there, and
+    return its key. Runs outside any transaction, before the reference is
+    added: a copy found here may already be released, but the collector
+    leaves it alone for DOCUMENT_GC_GRACE_SECONDS, longer than any upload
+    takes to commit its reference.
+    """
+    key = content_key(upload.sha256)
+    if not await storage.exists(key):
+        await storage.put_file(key, upload.path, content_type)
+    return key
+
+async def add_document_reference(db: AsyncSession, upload: SpooledUpload, content_type: str) -> StoredDocument:
+    """
+    Take one reference on the upload's content (already stored with
+    store_upload). The reference is an upsert, so concurrent uploads of the
+    same file end up with one row and the right count, and a released row is
+    taken back before the collector gets to it. The caller commits.
+    """
+    stmt = UPSERT_INSERTS[db.bind.dialect.name](StoredDocument).values(
+        sha256=upload.sha256,
+        storage_key=content_key(upload.sha256),
+        content_type=content_type,
+        size=upload.size,
+        ref_count=1,
+        created_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StoredDocument.sha256],
+        set_={"ref_count": StoredDocument.ref_count + 1, "released_at": None},
+    )
+    await db.execute(stmt)
+    return await db.get(StoredDocument, upload.sha256, populate_existing=True)
+
+async def release_document_reference(db: AsyncSession, sha256: str):
+    """
+    Drop one reference. The last one marks the row released; the blob stays
+    until collect_released_documents removes it. The caller commits.
+    """
+    await db.execute(
+        update(StoredDocument)
+        .where(StoredDocument.sha256 == sha256)
+        .values(
+            ref_count=StoredDocument.ref_count - 1,
+            released_at=case((StoredDocument.ref_count <= 1, datetime.utcnow()), else_=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+async def delete_blob(key: Optional[str]):
+    """Remove a released blob and any previews rendered from it."""
+    if key:
+        await storage.delete(key)
+        await delete_thumbnails(key.rsplit("/", 1)[-1])
+
+async def collect_released_documents(db: AsyncSession, grace_seconds: Optional[int] = None) -> List[str]:
+    """
+    Delete the rows released more than `grace_seconds` ago (default
+    DOCUMENT_GC_GRACE_SECONDS) and still unreferenced, then their blobs once
+    that commits. Returns the storage keys removed.
+    """
+    grace_seconds = settings.DOCUMENT_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    keys = (await db.execute(
+        delete(StoredDocument)
+        .where(StoredDocument.ref_count <= 0, StoredDocument.released_at <= cutoff)
+        .returning(StoredDocument.storage_key)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    await db.commit()
+    for key in keys:
+        await delete_blob(key)
+    return keys
+
+class DocumentCollector:
+    """In-process job running collect_released_documents every DOCUMENT_GC_INTERVAL_SECONDS."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if settings.DOCUMENT_GC_INTERVAL_SECONDS <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with AsyncWriteSessionLocal() as db:
+                    keys = await collect_released_documents(db)
+                if keys:
+                    print(f"🧹 Deleted {len(keys)} released documents")
+            except Exception as e:
+                print(f"❌ Document collection failed: {e}")
+            await asyncio.sleep(settings.DOCUMENT_GC_INTERVAL_SECONDS)
+
+document_collector = DocumentCollector()
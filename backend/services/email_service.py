@@ -1,9 +1,33 @@
+import asyncio
+import heapq
+import itertools
 import smtplib
 import random
 import string
+import time
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import List, Optional, Tuple
 from config import settings
+from services.metrics import EMAIL_QUEUE_DEPTH, EMAIL_SEND_FAILURES, EMAIL_SEND_LATENCY
+
+SMTP_IDLE_PROBE_SECONDS = 30
+
+@dataclass
+class OutgoingEmail:
+    to_email: str
+    subject: str
+    body: str
+    otp: str            # kept so a failed delivery can still be surfaced on the console
+    attempts: int = 0
+    not_before: float = 0.0  # time.monotonic() before which a retry is not sent
+
+def _is_permanent(e: smtplib.SMTPException) -> bool:
+    """5xx replies fail the same way on every retry; 4xx and dropped sessions may not."""
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in e.recipients.values())
+    return isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
 
 class EmailService:
     def __init__(self):
@@ -11,68 +35,250 @@ class EmailService:
         self.smtp_port   = settings.SMTP_PORT
         self.username    = settings.SMTP_USERNAME
         self.password    = settings.SMTP_PASSWORD
+        self.use_tls     = settings.SMTP_USE_TLS
         self.from_email  = settings.FROM_EMAIL or settings.SMTP_USERNAME
+        self._conn: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    @property
+    def is_configured(self) -> bool:
+        if settings.SMTP_REQUIRE_AUTH:
+            return bool(self.username and self.password)
+        return bool(self.smtp_server)
 
     def generate_otp(self) -> str:
         return ''.join(random.choices(string.digits, k=6))
 
-    def send_otp_email(
-        self,
-        to_email: str,
-        otp: str,
-        purpose: str = "login"   # <-- new parameter
-    ) -> bool:
+    def build_otp_email(self, to_email: str, otp: str, purpose: str = "login") -> OutgoingEmail:
         """
-        Send an OTP email. 
+        Compose an OTP email.
         `purpose` can be "login" or "registration" to customize subject/body.
         """
+        subject = (
+            "Your Mess Rebate System Registration OTP"
+            if purpose == "registration"
+            else "Your Mess Rebate System Login OTP"
+        )
+        body = (
+            f"Your OTP for Mess Rebate System {purpose} is: {otp}\n\n"
+            f"This OTP will expire in {settings.OTP_EXPIRE_MINUTES} minutes.\n\n"
+            "If you didn't request this OTP, please ignore this email."
+        )
+        return OutgoingEmail(to_email=to_email, subject=subject, body=body, otp=otp)
+
+    # ── Persistent SMTP connection (used from the delivery worker thread only) ──
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._conn is not None:
+            # Servers drop idle sessions; probe only after a quiet spell
+            if time.monotonic() - self._last_used < SMTP_IDLE_PROBE_SECONDS:
+                return self._conn
+            try:
+                if self._conn.noop()[0] == 250:
+                    return self._conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        conn = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=settings.SMTP_TIMEOUT_SECONDS)
         try:
-            if not self.username or not self.password:
-                print(f"🔐 OTP for {to_email}: {otp}")
-                print("📧 Email service not configured. OTP printed to console.")
-                return True
-
-            # Choose subject based on purpose
-            subject = (
-                "Your Mess Rebate System Registration OTP"
-                if purpose == "registration"
-                else "Your Mess Rebate System Login OTP"
-            )
-
-            # Compose message
+            if self.use_tls:
+                conn.starttls()
+            if self.username and self.password:
+                conn.login(self.username, self.password)
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+            raise
+        self._conn = conn
+        return conn
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conn = None
+
+    def send_batch(self, emails: List[OutgoingEmail]) -> List[OutgoingEmail]:
+        """
+        Send emails over one reused connection. Returns those worth retrying;
+        permanent (5xx) rejections are dropped. On a connection, TLS or login
+        error the connection is dropped and the rest of the batch is returned.
+        """
+        failed = []
+        for i, email in enumerate(emails):
             msg = MIMEMultipart()
             msg['From']    = self.from_email
-            msg['To']      = to_email
-            msg['Subject'] = subject
-
-            body = (
-                f"Your OTP for Mess Rebate System {purpose} is: {otp}\n\n"
-                f"This OTP will expire in {settings.OTP_EXPIRE_MINUTES} minutes.\n\n"
-                "If you didn't request this OTP, please ignore this email."
-            )
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Send via SMTP
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.username, self.password)
-            server.sendmail(self.from_email, to_email, msg.as_string())
-            server.quit()
-
-            return True
+            msg['To']      = email.to_email
+            msg['Subject'] = email.subject
+            msg.attach(MIMEText(email.body, 'plain'))
+            try:
+                conn = self._connection()
+            except smtplib.SMTPAuthenticationError as e:
+                print(f"❌ SMTP login failed: {e}")
+                EMAIL_SEND_FAILURES.labels("auth").inc()
+                return failed + emails[i:]
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"❌ SMTP connection error: {e}")
+                EMAIL_SEND_FAILURES.labels("connection").inc()
+                self.close()
+                return failed + emails[i:]
+            started = time.perf_counter()
+            try:
+                conn.sendmail(self.from_email, email.to_email, msg.as_string())
+                self._last_used = time.monotonic()
+                EMAIL_SEND_LATENCY.observe(time.perf_counter() - started)
+            except smtplib.SMTPServerDisconnected as e:
+                print(f"❌ SMTP connection error: {e}")
+                EMAIL_SEND_FAILURES.labels("connection").inc()
+                self.close()
+                return failed + emails[i:]
+            except smtplib.SMTPException as e:
+                # Refused by the server (SMTPException subclasses OSError, so test it first)
+                self._last_used = time.monotonic()
+                if _is_permanent(e):
+                    print(f"❌ Email to {email.to_email} rejected: {e}")
+                    EMAIL_SEND_FAILURES.labels("rejected").inc()
+                    print(f"🔐 OTP for {email.to_email}: {email.otp}")
+                else:
+                    print(f"⚠️ Email to {email.to_email} deferred: {e}")
+                    EMAIL_SEND_FAILURES.labels("deferred").inc()
+                    failed.append(email)
+            except OSError as e:
+                print(f"❌ SMTP connection error: {e}")
+                EMAIL_SEND_FAILURES.labels("connection").inc()
+                self.close()
+                return failed + emails[i:]
+        return failed
 
-        except Exception as e:
-            print(f"❌ Failed to send email: {e}")
+    def send_otp_email(
+        self,
+        to_email: str,
+        otp: str,
+        purpose: str = "login"
+    ) -> bool:
+        """Send an OTP email synchronously (scripts / no running delivery queue)."""
+        if not self.is_configured:
             print(f"🔐 OTP for {to_email}: {otp}")
+            print("📧 Email service not configured. OTP printed to console.")
             return True
+        if self.send_batch([self.build_otp_email(to_email, otp, purpose)]):
+            print(f"🔐 OTP for {to_email}: {otp}")
+        return True
+
+class EmailQueue:
+    """
+    In-process delivery queue. Handlers enqueue and return immediately; one
+    worker task drains the queue in batches and sends them from a worker
+    thread over the service's persistent SMTP connection. Failed mail is held
+    back with a not-before time (exponential backoff) while the worker keeps
+    sending everything else.
+    """
+
+    def __init__(self, service: EmailService):
+        self.service = service
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._deferred: List[Tuple[float, int, OutgoingEmail]] = []  # heap on not_before
+        self._sequence = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def qsize(self) -> int:
+        return (self._queue.qsize() if self._queue is not None else 0) + len(self._deferred)
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._deferred = []
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Let queued mail drain for up to `timeout` seconds, then stop the worker."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Email queue stopped with {self.qsize()} undelivered messages")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        await asyncio.to_thread(self.service.close)
+
+    def enqueue(self, email: OutgoingEmail):
+        self._queue.put_nowait(email)
+
+    def _defer(self, email: OutgoingEmail):
+        # Still counted as unfinished on the queue until delivered or given up
+        heapq.heappush(self._deferred, (email.not_before, next(self._sequence), email))
+
+    async def _next_batch(self) -> List[OutgoingEmail]:
+        """Due retries plus newly queued mail; waits only until the next retry is due."""
+        while True:
+            batch = []
+            now = time.monotonic()
+            while self._deferred and self._deferred[0][0] <= now and len(batch) < settings.EMAIL_BATCH_SIZE:
+                batch.append(heapq.heappop(self._deferred)[2])
+            if not batch:
+                wait = self._deferred[0][0] - now if self._deferred else None
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), wait))
+                except asyncio.TimeoutError:
+                    continue
+            while len(batch) < settings.EMAIL_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                failed = await asyncio.to_thread(self.service.send_batch, batch)
+            except Exception as e:
+                print(f"❌ Email delivery worker error: {e}")
+                failed = batch
+            self._settle(batch, failed)
+
+    def _settle(self, batch: List[OutgoingEmail], failed: List[OutgoingEmail]):
+        retry = {id(email) for email in failed}
+        for email in batch:
+            if id(email) in retry:
+                email.attempts += 1
+                if email.attempts < settings.EMAIL_MAX_ATTEMPTS:
+                    backoff = settings.EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1)
+                    email.not_before = time.monotonic() + backoff
+                    self._defer(email)
+                    continue
+                print(f"❌ Giving up on email to {email.to_email} after {email.attempts} attempts")
+                EMAIL_SEND_FAILURES.labels("gave_up").inc()
+                print(f"🔐 OTP for {email.to_email}: {email.otp}")
+            self._queue.task_done()
 
-# Single, shared instance
+# Single, shared instances
 email_service = EmailService()
+email_queue = EmailQueue(email_service)
+EMAIL_QUEUE_DEPTH.set_function(email_queue.qsize)
 
 def send_otp_email(
     to_email: str,
     otp: str,
-    purpose: str = "login"   # <-- ensure module‑level signature matches
+    purpose: str = "login"
 ) -> bool:
-    """Convenience wrapper for the shared EmailService."""
-    return email_service.send_otp_email(to_email, otp, purpose)
+    """
+    Hand an OTP email to the delivery queue and return without waiting for
+    SMTP. Falls back to a synchronous send when the queue is not running.
+    """
+    if not email_service.is_configured or not email_queue.running:
+        return email_service.send_otp_email(to_email, otp, purpose)
+    email_queue.enqueue(email_service.build_otp_email(to_email, otp, purpose))
+    return True
@@ -0,0 +1,180 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Optional, Set
+
+from config import settings
+from services.metrics import EVENT_STREAMS, EVENTS_PUBLISHED, EVENT_STREAMS_DROPPED
+
+ADMIN_TOPIC = "admins"
+REDIS_CHANNEL_PREFIX = "rebate-portal:events:"
+RECONNECT_MS = 5000
+
+def student_topic(student_id: int) -> str:
+    return f"student:{student_id}"
+
+class Subscription:
+    """One open stream's queue of ready-to-send SSE frames. None marks an overflow."""
+
+    def __init__(self, broker: "InProcessBroker", topic: str, maxsize: int):
+        self.broker = broker
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def offer(self, frame: str):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind: drop what is queued and end the stream; the
+            # client reconnects and refetches instead of reading stale events
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[str]:
+        return await self.queue.get()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.broker._unsubscribe(self)
+
+class InProcessBroker:
+    """
+    Fans published events out to this worker's open streams. Default
+    backend; with several workers only streams on the publishing worker
+    see an event (use EVENTS_URL).
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, topic: str, message: str):
+        self.deliver(topic, message)
+
+    def deliver(self, topic: str, message: str):
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        frame = f"data: {message}\n\n"      # formatted once for every subscriber
+        for subscription in list(subscribers):
+            subscription.offer(frame)
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic, self.queue_size)
+        self._subscribers[topic].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.topic]
+
+class RedisBroker(InProcessBroker):
+    """
+    Multi-worker backend: events are published to Redis, and one pattern
+    subscription per worker feeds that worker's streams, so open streams
+    cost no Redis connections. Accepts a redis.asyncio client.
+    """
+
+    def __init__(self, client, queue_size: int):
+        super().__init__(queue_size)
+        self._client = client
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def publish(self, topic: str, message: str):
+        await self._client.publish(REDIS_CHANNEL_PREFIX + topic, message)
+
+    async def _listen(self):
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+                async for item in pubsub.listen():
+                    if item["type"] != "pmessage":
+                        continue
+                    channel, data = item["channel"], item["data"]
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    data = data.decode() if isinstance(data, bytes) else data
+                    self.deliver(channel[len(REDIS_CHANNEL_PREFIX):], data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Event listener lost Redis, retrying: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+def _build_broker():
+    if not settings.EVENTS_URL:
+        return InProcessBroker(settings.EVENTS_QUEUE_SIZE)
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise RuntimeError("EVENTS_URL is set but the 'redis' package is not installed")
+    return RedisBroker(redis.from_url(settings.EVENTS_URL), settings.EVENTS_QUEUE_SIZE)
+
+broker = _build_broker()
+
+async def _publish(topic: str, event_type: str, data: dict):
+    # Events are hints to refetch; a failed publish must not fail the write that caused it
+    try:
+        await broker.publish(topic, json.dumps({"type": event_type, **data}, default=str))
+        EVENTS_PUBLISHED.labels(event_type).inc()
+    except Exception as e:
+        print(f"❌ Failed to publish {event_type} event: {e}")
+
+async def notify_student(student_id: int, event_type: str, **data):
+    """Push an event to the student's open streams. Call after the commit."""
+    await _publish(student_topic(student_id), event_type, data)
+
+async def notify_admins(event_type: str, **data):
+    """Push an event to every admin's open streams. Call after the commit."""
+    await _publish(ADMIN_TOPIC, event_type, data)
+
+async def event_frames(topic: str) -> AsyncIterator[str]:
+    """
+    SSE frames for one stream: events published to `topic`, with a comment
+    line every EVENTS_HEARTBEAT_SECONDS while idle. Ends if the client
+    falls EVENTS_QUEUE_SIZE events behind.
+    """
+    with broker.subscribe(topic) as subscription:
+        EVENT_STREAMS.inc()
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    EVENT_STREAMS_DROPPED.inc()
+                    return
+                yield frame
+        finally:
+            EVENT_STREAMS.dec()
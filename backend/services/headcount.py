@@ -0,0 +1,230 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, update, delete, insert, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import UPSERT_INSERTS
+from models import User, UserRole, RebateRequest, RequestStatus, HostelDailyHeadcount
+from services.rebate_rules import ACTIVE_STATUSES
+
+INSERT_BATCH_SIZE = 1000
+
+# (approved, pending) weight a request contributes to each of its days
+_WEIGHTS = {
+    RequestStatus.APPROVED: (1, 0),
+    RequestStatus.PENDING: (0, 1),
+}
+
+# Students counted in the forecast, as residents and in the rollup alike
+COUNTED_STUDENTS = and_(User.is_active.is_(True), User.hostel.isnot(None), User.hostel != "")
+
+# (hostel, start_date, end_date, approved delta, pending delta)
+Interval = Tuple[str, date, date, int, int]
+
+def daily_counts(intervals: Iterable[Interval]) -> Dict[Tuple[str, date], Tuple[int, int]]:
+    """
+    Sum weighted date ranges into (approved, pending) per (hostel, day) with
+    a difference-array sweep: each interval adds its weights at its first day
+    and takes them back the day after its last, then a cumulative sum along
+    each hostel's row gives the daily totals. Only non-zero days are returned.
+    """
+    intervals = list(intervals)
+    if not intervals:
+        return {}
+    hostels = sorted({i[0] for i in intervals})
+    row_of = {hostel: n for n, hostel in enumerate(hostels)}
+    rows = np.array([row_of[i[0]] for i in intervals], dtype=np.int64)
+    starts = np.array([i[1] for i in intervals], dtype="datetime64[D]")
+    ends = np.array([i[2] for i in intervals], dtype="datetime64[D]")
+    weights = np.array([(i[3], i[4]) for i in intervals], dtype=np.int64)
+
+    origin = starts.min()
+    width = int((ends.max() - origin).astype(np.int64)) + 2
+    diff = np.zeros((len(hostels) * width, 2), dtype=np.int64)
+    np.add.at(diff, rows * width + (starts - origin).astype(np.int64), weights)
+    np.subtract.at(diff, rows * width + (ends - origin).astype(np.int64) + 1, weights)
+    counts = np.cumsum(diff.reshape(len(hostels), width, 2), axis=1)
+
+    hostel_rows, offsets = np.nonzero(counts.any(axis=2))
+    days = (origin + offsets).tolist()
+    return {
+        (hostels[h], day): (approved, pending)
+        for h, day, (approved, pending) in zip(hostel_rows.tolist(), days, counts[hostel_rows, offsets].tolist())
+    }
+
+async def _apply_deltas(db: AsyncSession, deltas: Dict[Tuple[str, date], Tuple[int, int]]):
+    """Add per-day deltas to hostel_daily_headcounts, dropping rows that reach zero."""
+    if not deltas:
+        return
+    params = [
+        {"hostel": hostel, "day": day, "approved": approved, "pending": pending}
+        for (hostel, day), (approved, pending) in deltas.items()
+    ]
+
+    dialect_insert = UPSERT_INSERTS.get(db.bind.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(HostelDailyHeadcount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[HostelDailyHeadcount.hostel, HostelDailyHeadcount.day],
+            set_={
+                "approved": HostelDailyHeadcount.approved + stmt.excluded.approved,
+                "pending": HostelDailyHeadcount.pending + stmt.excluded.pending,
+            },
+        )
+        await db.execute(stmt, params)
+    else:
+        for row in params:
+            result = await db.execute(
+                update(HostelDailyHeadcount)
+                .where(HostelDailyHeadcount.hostel == row["hostel"], HostelDailyHeadcount.day == row["day"])
+                .values(
+                    approved=HostelDailyHeadcount.approved + row["approved"],
+                    pending=HostelDailyHeadcount.pending + row["pending"],
+                )
+            )
+            if result.rowcount == 0:
+                db.add(HostelDailyHeadcount(**row))
+
+    if any(a < 0 or p < 0 for a, p in deltas.values()):
+        days = [day for _, day in deltas]
+        await db.execute(
+            delete(HostelDailyHeadcount)
+            .where(
+                HostelDailyHeadcount.hostel.in_({hostel for hostel, _ in deltas}),
+                HostelDailyHeadcount.day.between(min(days), max(days)),
+                HostelDailyHeadcount.approved == 0,
+                HostelDailyHeadcount.pending == 0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+async def record_headcount_changes(
+    db: AsyncSession,
+    changes: Iterable[Tuple[int, date, date, Optional[RequestStatus], RequestStatus]],
+):
+    """
+    Apply rebate request status changes, as `(student_id, start_date,
+    end_date, old, new)` tuples (old None = new request), to the daily
+    headcount rollup inside the caller's transaction. Days are counted under
+    the student's hostel; inactive students and those without a hostel are
+    not counted (COUNTED_STUDENTS).
+    """
+    changes = [c for c in changes if c[3] != c[4]]
+    if not changes:
+        return
+    hostels = dict((await db.execute(
+        select(User.id, User.hostel).where(User.id.in_({c[0] for c in changes}), COUNTED_STUDENTS)
+    )).all())
+
+    intervals = []
+    for student_id, start_date, end_date, old_status, new_status in changes:
+        hostel = hostels.get(student_id)
+        if not hostel:
+            continue
+        old_approved, old_pending = _WEIGHTS.get(old_status, (0, 0))
+        new_approved, new_pending = _WEIGHTS.get(new_status, (0, 0))
+        if (old_approved, old_pending) != (new_approved, new_pending):
+            intervals.append((hostel, start_date, end_date, new_approved - old_approved, new_pending - old_pending))
+    await _apply_deltas(db, daily_counts(intervals))
+
+async def move_student_headcounts(
+    db: AsyncSession,
+    student_id: int,
+    old_hostel: Optional[str],
+    new_hostel: Optional[str],
+):
+    """Re-count a student's pending/approved days under their new hostel (profile edit)."""
+    if (old_hostel or None) == (new_hostel or None):
+        return
+    rows = (await db.execute(
+        select(RebateRequest.start_date, RebateRequest.end_date, RebateRequest.status)
+        .join(User, User.id == RebateRequest.student_id)
+        .where(
+            RebateRequest.student_id == student_id,
+            RebateRequest.status.in_(ACTIVE_STATUSES),
+            User.is_active.is_(True),
+        )
+    )).all()
+    intervals = []
+    for start_date, end_date, request_status in rows:
+        approved, pending = _WEIGHTS[request_status]
+        if old_hostel:
+            intervals.append((old_hostel, start_date, end_date, -approved, -pending))
+        if new_hostel:
+            intervals.append((new_hostel, start_date, end_date, approved, pending))
+    await _apply_deltas(db, daily_counts(intervals))
+
+async def headcount_forecast(db: AsyncSession, start: date, end: date, hostel: Optional[str] = None) -> List[dict]:
+    """
+    Per hostel, the active students and, for each day in [start, end], how
+    many are on approved or pending rebate and the resulting headcount:
+    `expected` counts pending requests as eating, `minimum` as away.
+    Two queries: residents grouped by hostel, and the rollup rows in range.
+    """
+    residents_query = (
+        select(User.hostel, func.count(User.id))
+        .where(User.role == UserRole.STUDENT, COUNTED_STUDENTS)
+        .group_by(User.hostel)
+    )
+    rollup_query = select(
+        HostelDailyHeadcount.hostel,
+        HostelDailyHeadcount.day,
+        HostelDailyHeadcount.approved,
+        HostelDailyHeadcount.pending,
+    ).where(HostelDailyHeadcount.day.between(start, end))
+    if hostel:
+        residents_query = residents_query.where(User.hostel == hostel)
+        rollup_query = rollup_query.where(HostelDailyHeadcount.hostel == hostel)
+
+    residents = dict((await db.execute(residents_query)).all())
+    on_rebate = defaultdict(dict)
+    for row in (await db.execute(rollup_query)).all():
+        on_rebate[row.hostel][row.day] = (row.approved, row.pending)
+
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1).tolist()
+    forecast = []
+    for name in sorted(set(residents) | set(on_rebate)):
+        total = residents.get(name, 0)
+        counts = on_rebate.get(name, {})
+        entries = []
+        for day in days:
+            approved, pending = counts.get(day, (0, 0))
+            entries.append({
+                "date": day,
+                "approved": approved,
+                "pending": pending,
+                "expected": max(total - approved, 0),
+                "minimum": max(total - approved - pending, 0),
+            })
+        forecast.append({"hostel": name, "residents": total, "days": entries})
+    return forecast
+
+def rebuild_hostel_headcounts(db: Session) -> int:
+    """
+    Recompute hostel_daily_headcounts from the pending/approved requests of
+    COUNTED_STUDENTS in one sweep (also the way to pick up is_active edits
+    made outside the app). Returns the number of (hostel, day) rows written.
+    """
+    rows = db.execute(
+        select(User.hostel, RebateRequest.start_date, RebateRequest.end_date, RebateRequest.status)
+        .join(User, User.id == RebateRequest.student_id)
+        .where(RebateRequest.status.in_(ACTIVE_STATUSES), COUNTED_STUDENTS)
+    ).all()
+    counts = daily_counts(
+        (hostel, start_date, end_date, *_WEIGHTS[request_status])
+        for hostel, start_date, end_date, request_status in rows
+    )
+    params = [
+        {"hostel": hostel, "day": day, "approved": approved, "pending": pending}
+        for (hostel, day), (approved, pending) in counts.items()
+    ]
+
+    db.execute(delete(HostelDailyHeadcount))
+    for i in range(0, len(params), INSERT_BATCH_SIZE):
+        db.execute(insert(HostelDailyHeadcount), params[i:i + INSERT_BATCH_SIZE])
+    db.commit()
+    return len(params)
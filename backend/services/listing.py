@@ -0,0 +1,98 @@
+import base64
+import binascii
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import User, RebateRequest, RequestStatus
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor for the `(created_at, id)` keyset of the last row on a page."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; rejects anything it did not produce."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    created_col,
+    id_col,
+    cursor: Optional[str],
+    limit: int,
+    response: Response,
+):
+    """
+    Keyset-paginate the select `query` newest first on `(created_col, id_col)`.
+    Fetches one extra row to detect a following page and, if there is one,
+    advertises its cursor in the X-Next-Cursor response header.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id),
+            )
+        )
+
+    result = await db.execute(query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1))
+    # Single-entity selects page over ORM objects, projections over rows
+    rows = result.scalars().all() if len(result.keys()) == 1 else result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, created_col.key), getattr(last, id_col.key)
+        )
+    return rows
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def filter_students(query, hostel: Optional[str] = None, roll_prefix: Optional[str] = None):
+    """Push hostel / roll-number-prefix filters on `User` into SQL."""
+    if hostel:
+        query = query.where(User.hostel == hostel)
+    if roll_prefix:
+        query = query.where(User.roll_number.like(f"{_escape_like(roll_prefix)}%", escape="\\"))
+    return query
+
+def filter_rebate_requests(
+    query,
+    status_filter: Optional[str] = None,
+    hostel: Optional[str] = None,
+    roll_prefix: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """
+    Push rebate request filters into SQL. Hostel and roll-number prefix
+    require `User` to already be joined on the student. The date range
+    keeps requests whose rebate period overlaps [date_from, date_to].
+    """
+    if status_filter:
+        try:
+            enum_status = RequestStatus(status_filter.lower())
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status filter")
+        query = query.where(RebateRequest.status == enum_status)
+    if date_from:
+        query = query.where(RebateRequest.end_date >= date_from)
+    if date_to:
+        query = query.where(RebateRequest.start_date <= date_to)
+    return filter_students(query, hostel=hostel, roll_prefix=roll_prefix)
@@ -0,0 +1,114 @@
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database import pool_stats
+
+# Own registry: only this app's metrics, no default process/platform collectors
+registry = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template and status.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry,
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served.", registry=registry)
+
+OTP_ISSUED = Counter("otp_issued_total", "OTPs issued.", ["purpose"], registry=registry)
+OTP_THROTTLED = Counter("otp_throttled_total", "OTP requests refused by the per-email rate limit.", registry=registry)
+OTP_VERIFICATIONS = Counter(
+    "otp_verifications_total", "OTP verification attempts.", ["result"], registry=registry
+)
+
+EMAIL_SEND_LATENCY = Histogram(
+    "email_send_duration_seconds",
+    "Time to hand one message to the SMTP server.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry,
+)
+EMAIL_SEND_FAILURES = Counter(
+    "email_send_failures_total", "Failed email sends.", ["reason"], registry=registry
+)
+EMAIL_QUEUE_DEPTH = Gauge("email_queue_depth", "Emails waiting for delivery.", registry=registry)
+
+REBATE_DECISIONS = Counter(
+    "rebate_request_decisions_total",
+    "Rebate requests moved to approved/rejected by admins.",
+    ["status", "source"],
+    registry=registry,
+)
+
+EVENT_STREAMS = Gauge("event_streams_open", "Open server-sent event streams on this worker.", registry=registry)
+EVENTS_PUBLISHED = Counter("events_published_total", "Push events published.", ["type"], registry=registry)
+EVENT_STREAMS_DROPPED = Counter(
+    "event_streams_dropped_total", "Streams closed because the client fell too far behind.", registry=registry
+)
+
+class PoolCollector:
+    """DB pool usage and checkout waits from database.pool_stats(), read at scrape time."""
+
+    def collect(self):
+        usage = {
+            key: GaugeMetricFamily(f"db_pool_{key}", f"Pool connections: {key.replace('_', ' ')}.", labels=["engine"])
+            for key in ("size", "checked_out", "checked_in", "overflow")
+        }
+        waits = HistogramMetricFamily(
+            "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", labels=["engine"]
+        )
+        for engine_name, stats in pool_stats().items():
+            for key, family in usage.items():
+                if key in stats:
+                    family.add_metric([engine_name], stats[key])
+            wait = stats.get("wait_time")
+            if wait:
+                waits.add_metric([engine_name], list(wait["buckets"].items()), wait["sum_seconds"])
+        yield from usage.values()
+        yield waits
+
+registry.register(PoolCollector())
+
+def render_metrics() -> tuple:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """
+    Request latency per route template/status and the in-flight gauge.
+    Server-sent event streams are left out of both once their response
+    starts; event_streams_open tracks them instead.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streaming = False
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    streaming = True
+                    REQUESTS_IN_FLIGHT.dec()
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not streaming:
+                REQUESTS_IN_FLIGHT.dec()
+                # Label by route template, not raw path, to keep cardinality bounded
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                REQUEST_LATENCY.labels(scope["method"], route, str(status_code)).observe(time.perf_counter() - started)
@@ -0,0 +1,218 @@
+import asyncio
+import math
+import random
+import string
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncWriteSessionLocal
+from models import OTP
+from services.metrics import OTP_ISSUED, OTP_THROTTLED, OTP_VERIFICATIONS
+
+# Buckets idle long enough to have refilled are dropped once the table grows past this
+THROTTLE_MAX_KEYS = 10000
+
+def generate_otp(length: int = 6) -> str:
+    """Generate a random numeric OTP."""
+    return "".join(random.choices(string.digits, k=length))
+
+class OTPThrottle:
+    """
+    Per-email token bucket: `burst` OTPs back to back, refilled at
+    `per_minute`. In-process, so each worker enforces its own allowance.
+    """
+
+    def __init__(self, burst: int, per_minute: float):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def acquire(self, key: str) -> Optional[float]:
+        """Take one token for `key`. Returns None if allowed, else seconds until the next token."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > THROTTLE_MAX_KEYS:
+                self._prune(now)
+            return None
+
+    def _prune(self, now: float):
+        full_after = self.burst / self.rate if self.rate > 0 else float("inf")
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+class OTPFailureGuard:
+    """
+    Failed verifications per email. The `max_failures`-th wrong code locks
+    the email for `lockout_seconds`; failures are forgotten after that long
+    without another. In-process, like OTPThrottle.
+    """
+
+    def __init__(self, max_failures: int, lockout_seconds: float):
+        self.max_failures = max_failures
+        self.lockout = lockout_seconds
+        self._lock = threading.Lock()
+        self._failures: Dict[str, Tuple[int, float]] = {}  # key -> (count, last failure)
+
+    def _count(self, key: str, now: float) -> Tuple[int, float]:
+        count, last = self._failures.get(key, (0, now))
+        return (0, now) if now - last >= self.lockout else (count, last)
+
+    def locked_for(self, key: str) -> Optional[float]:
+        """Seconds until `key` may verify again, or None if it is not locked."""
+        now = time.monotonic()
+        with self._lock:
+            count, last = self._count(key, now)
+            return last + self.lockout - now if count >= self.max_failures else None
+
+    def fail(self, key: str) -> bool:
+        """Record a wrong code for `key`. Returns True when this failure locks it."""
+        now = time.monotonic()
+        with self._lock:
+            count = self._count(key, now)[0] + 1
+            self._failures[key] = (count, now)
+            if len(self._failures) > THROTTLE_MAX_KEYS:
+                for stale in [k for k, (_, last) in self._failures.items() if now - last >= self.lockout]:
+                    del self._failures[stale]
+            return count >= self.max_failures
+
+    def reset(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
+
+otp_throttle = OTPThrottle(settings.OTP_RATE_LIMIT_BURST, settings.OTP_RATE_LIMIT_PER_MINUTE)
+otp_failures = OTPFailureGuard(settings.OTP_MAX_VERIFY_FAILURES, settings.OTP_VERIFY_LOCKOUT_SECONDS)
+
+def check_otp_rate_limit(email: str):
+    """Raise 429 when `email` has used up its OTP allowance."""
+    wait = otp_throttle.acquire(email.lower().strip())
+    if wait is not None:
+        OTP_THROTTLED.inc()
+        retry_after = str(math.ceil(wait)) if math.isfinite(wait) else "3600"
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many OTP requests. Please wait before requesting another.",
+            headers={"Retry-After": retry_after},
+        )
+
+def _verify_locked(wait: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many failed OTP attempts. Please wait and request a new OTP.",
+        headers={"Retry-After": str(max(math.ceil(wait), 1))},
+    )
+
+def check_otp_verify_lock(email: str):
+    """Raise 429 while `email` is locked out after repeated wrong codes."""
+    wait = otp_failures.locked_for(email.lower().strip())
+    if wait is not None:
+        OTP_VERIFICATIONS.labels("locked").inc()
+        raise _verify_locked(wait)
+
+async def record_otp_failure(db: AsyncSession, email: str, user_id: int):
+    """
+    Count a wrong code for `email`. On the failure that hits the limit, void
+    the user's outstanding OTPs (committed here) and raise 429.
+    """
+    if otp_failures.fail(email.lower().strip()):
+        await invalidate_otps(db, user_id)
+        await db.commit()
+        OTP_VERIFICATIONS.labels("locked").inc()
+        raise _verify_locked(otp_failures.lockout)
+
+def clear_otp_failures(email: str):
+    otp_failures.reset(email.lower().strip())
+
+async def invalidate_otps(db: AsyncSession, user_id: int):
+    """Mark all of the user's outstanding OTPs used. The caller commits."""
+    await db.execute(
+        update(OTP)
+        .where(OTP.user_id == user_id, OTP.is_used == False)
+        .values(is_used=True)
+        .execution_options(synchronize_session=False)
+    )
+
+async def issue_otp(db: AsyncSession, user_id: int, purpose: str) -> str:
+    """
+    Store a fresh OTP for the user and mark their earlier outstanding ones
+    used, so only the latest code verifies. The caller commits.
+    """
+    await invalidate_otps(db, user_id)
+    otp_code = generate_otp()
+    db.add(OTP(
+        user_id=user_id,
+        otp_code=otp_code,
+        purpose=purpose,
+        expires_at=datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
+    ))
+    OTP_ISSUED.labels(purpose).inc()
+    return otp_code
+
+async def purge_otps(db: AsyncSession, batch_size: int = None) -> int:
+    """
+    Delete used and expired OTPs, `batch_size` rows per transaction so the
+    purge never holds long locks. Returns the number of rows deleted.
+    """
+    batch_size = batch_size or settings.OTP_PURGE_BATCH_SIZE
+    deleted = 0
+    while True:
+        ids = (await db.execute(
+            select(OTP.id)
+            .where(or_(OTP.is_used == True, OTP.expires_at <= datetime.utcnow()))
+            .limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            break
+        await db.execute(delete(OTP).where(OTP.id.in_(ids)).execution_options(synchronize_session=False))
+        await db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+class OTPPurger:
+    """In-process job running purge_otps every OTP_PURGE_INTERVAL_SECONDS."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if settings.OTP_PURGE_INTERVAL_SECONDS <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with AsyncWriteSessionLocal() as db:
+                    deleted = await purge_otps(db)
+                if deleted:
+                    print(f"🧹 Purged {deleted} used/expired OTPs")
+            except Exception as e:
+                print(f"❌ OTP purge failed: {e}")
+            await asyncio.sleep(settings.OTP_PURGE_INTERVAL_SECONDS)
+
+otp_purger = OTPPurger()
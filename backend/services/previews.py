@@ -0,0 +1,84 @@
+import asyncio
+import io
+import os
+import tempfile
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from models import StoredDocument
+from services.storage import storage, thumbnail_key
+
+# Widths a preview can be requested at; bounded so the cache stays small
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_QUALITY = 80
+
+# Rendering is CPU-bound; cap how many run at once so previews can't starve requests
+_render_slots = asyncio.Semaphore(2)
+
+def _render(source_path: str, content_type: str, width: int) -> bytes:
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError("Previews need the 'Pillow' package")
+
+    if content_type == "application/pdf":
+        try:
+            import fitz  # PyMuPDF
+        except ImportError:
+            raise RuntimeError("PDF previews need the 'PyMuPDF' package")
+        with fitz.open(source_path) as pdf:
+            page = pdf[0]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    else:
+        image = Image.open(source_path)
+        # Let the JPEG decoder downscale while decoding instead of after
+        image.draft("RGB", (width, width * 4))
+        image = ImageOps.exif_transpose(image)
+
+    image.thumbnail((width, width * 4))
+    out = io.BytesIO()
+    image.convert("RGB").save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    return out.getvalue()
+
+async def ensure_thumbnail(document: StoredDocument, width: int) -> str:
+    """
+    Storage key of the document's JPEG preview at `width` (first page for
+    PDFs), rendering and storing it on first request. Previews are keyed by
+    content hash, so every request sharing the file shares the preview.
+    """
+    key = thumbnail_key(document.sha256, width)
+    if await storage.exists(key):
+        return key
+
+    fd, out_path = tempfile.mkstemp(suffix=".jpg")
+    os.close(fd)
+    source_path = storage.local_path(document.storage_key)
+    fetched = None
+    try:
+        if source_path is None:
+            fd, fetched = tempfile.mkstemp()
+            os.close(fd)
+            await storage.fetch(document.storage_key, fetched)
+            source_path = fetched
+        async with _render_slots:
+            try:
+                data = await run_in_threadpool(_render, source_path, document.content_type, width)
+            except RuntimeError as e:
+                raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+            except Exception:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Could not render a preview of this document.")
+        with open(out_path, "wb") as fh:
+            fh.write(data)
+        await storage.put_file(key, out_path, "image/jpeg")
+    finally:
+        for path in (out_path, fetched):
+            if path and os.path.exists(path):
+                os.remove(path)
+    return key
+
+async def delete_thumbnails(sha256: str):
+    for width in THUMBNAIL_WIDTHS:
+        await storage.delete(thumbnail_key(sha256, width))
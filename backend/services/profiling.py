@@ -0,0 +1,145 @@
+import contextvars
+import heapq
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from database import engine, async_engine, write_engine
+
+STATEMENT_PREVIEW_CHARS = 80
+
+class RequestProfile:
+    """SQL issued while serving one request."""
+
+    __slots__ = ("scope", "count", "seconds", "slowest")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: List[Tuple[float, str]] = []     # min-heap of the N slowest
+
+    def record(self, seconds: float, statement: str):
+        self.count += 1
+        self.seconds += seconds
+        entry = (seconds, statement)
+        if len(self.slowest) < settings.SQL_PROFILE_TOP_N:
+            heapq.heappush(self.slowest, entry)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    @property
+    def route(self) -> str:
+        # FastAPI puts the matched route into the scope before the handler runs
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', None) or 'unmatched'}"
+
+_current: contextvars.ContextVar = contextvars.ContextVar("sql_profile", default=None)
+
+class RouteStats:
+    """Per-route aggregates since startup (or the last reset)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, dict] = {}
+
+    def add(self, route: str, profile: RequestProfile, request_seconds: float):
+        with self._lock:
+            s = self._routes.get(route)
+            if s is None:
+                s = self._routes[route] = {
+                    "requests": 0, "queries": 0, "db_seconds": 0.0, "request_seconds": 0.0,
+                    "max_queries": 0, "max_db_seconds": 0.0,
+                }
+            s["requests"] += 1
+            s["queries"] += profile.count
+            s["db_seconds"] += profile.seconds
+            s["request_seconds"] += request_seconds
+            s["max_queries"] = max(s["max_queries"], profile.count)
+            s["max_db_seconds"] = max(s["max_db_seconds"], profile.seconds)
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            rows = [
+                {
+                    "route": route,
+                    "requests": s["requests"],
+                    "avg_queries": round(s["queries"] / s["requests"], 2),
+                    "max_queries": s["max_queries"],
+                    "avg_db_ms": round(s["db_seconds"] * 1000 / s["requests"], 3),
+                    "max_db_ms": round(s["max_db_seconds"] * 1000, 3),
+                    "total_db_ms": round(s["db_seconds"] * 1000, 3),
+                    "avg_request_ms": round(s["request_seconds"] * 1000 / s["requests"], 3),
+                }
+                for route, s in self._routes.items()
+            ]
+        return sorted(rows, key=lambda r: r["total_db_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+route_stats = RouteStats()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_profile_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sql_profile_started"].pop()
+    elapsed = time.perf_counter() - started
+    profile = _current.get()
+    if profile is not None:
+        profile.record(elapsed, statement)
+    if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        route = profile.route if profile is not None else "-"
+        print(f"🐢 Slow query ({elapsed * 1000:.1f} ms) on {route}: {' '.join(statement.split())[:500]}")
+
+def install_query_hooks():
+    """Attach the timing listeners to every engine (only called when profiling is on)."""
+    for target in {engine, async_engine.sync_engine, write_engine.sync_engine}:
+        if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+            event.listen(target, "before_cursor_execute", _before_cursor_execute)
+            event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+def _server_timing(profile: RequestProfile) -> str:
+    entries = [f'db;dur={profile.seconds * 1000:.3f};desc="{profile.count} queries"']
+    for i, (seconds, statement) in enumerate(sorted(profile.slowest, reverse=True), 1):
+        preview = " ".join(statement.split())[:STATEMENT_PREVIEW_CHARS].replace('"', "'").replace("\\", "")
+        preview = preview.encode("ascii", "replace").decode()
+        entries.append(f'db-{i};dur={seconds * 1000:.3f};desc="{preview}"')
+    return ", ".join(entries)
+
+class SQLProfilingMiddleware:
+    """
+    Collects per-request statement counts and DB time, adds them to the
+    response as Server-Timing and folds them into route_stats. Registered
+    only when SQL_PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = _current.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", _server_timing(profile))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route_stats.add(profile.route, profile, time.perf_counter() - started)
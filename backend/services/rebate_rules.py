@@ -0,0 +1,139 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import RebateRequest, RequestStatus
+
+# Requests that still hold their days (and so may not be overlapped)
+ACTIVE_STATUSES = (RequestStatus.PENDING, RequestStatus.APPROVED)
+
+# PostgreSQL backstop for concurrent overlapping writes (models.RebateRequest)
+OVERLAP_CONSTRAINT = "ex_rebate_requests_no_overlap"
+
+def semester_bounds(day: date) -> Tuple[date, date]:
+    """Semesters are calendar halves: January–June and July–December."""
+    if day.month <= 6:
+        return date(day.year, 1, 1), date(day.year, 6, 30)
+    return date(day.year, 7, 1), date(day.year, 12, 31)
+
+def _clipped_days(start: date, end: date, lo: date, hi: date) -> int:
+    return max((min(end, hi) - max(start, lo)).days + 1, 0)
+
+def _rule_violation(start_date: date, end_date: date, held: Iterable[Tuple[date, date]]) -> Optional[str]:
+    """Why a request for start_date..end_date can't be added next to `held`, or None."""
+    held = list(held)
+    for held_start, held_end in held:
+        if held_start <= end_date and held_end >= start_date:
+            return (
+                f"Dates overlap an existing rebate request "
+                f"({held_start.isoformat()} to {held_end.isoformat()})."
+            )
+
+    used = defaultdict(int)
+    semesters = {semester_bounds(start_date), semester_bounds(end_date)}
+    for lo, hi in semesters:
+        used[(lo, hi)] += _clipped_days(start_date, end_date, lo, hi)
+        for held_start, held_end in held:
+            used[(lo, hi)] += _clipped_days(held_start, held_end, lo, hi)
+    for (lo, hi), days in used.items():
+        if days > settings.SEMESTER_REBATE_DAY_CAP:
+            return (
+                f"Rebate days for the semester {lo.isoformat()} to {hi.isoformat()} "
+                f"would exceed the limit of {settings.SEMESTER_REBATE_DAY_CAP} days."
+            )
+    return None
+
+async def _held_ranges(db: AsyncSession, windows: Dict[int, Tuple[date, date]]) -> Dict[int, List[Tuple[date, date]]]:
+    """Each student's pending/approved ranges inside their (start, end) window, in one query."""
+    held = defaultdict(list)
+    if not windows:
+        return held
+    rows = (await db.execute(
+        select(RebateRequest.student_id, RebateRequest.start_date, RebateRequest.end_date)
+        .where(
+            RebateRequest.status.in_(ACTIVE_STATUSES),
+            or_(*(
+                and_(
+                    RebateRequest.student_id == student_id,
+                    RebateRequest.start_date <= window_end,
+                    RebateRequest.end_date >= window_start,
+                )
+                for student_id, (window_start, window_end) in windows.items()
+            )),
+        )
+    )).all()
+    for row in rows:
+        held[row.student_id].append((row.start_date, row.end_date))
+    return held
+
+async def check_new_rebate_request(
+    db: AsyncSession,
+    student_id: int,
+    start_date: date,
+    end_date: date,
+    status_code: int = status.HTTP_400_BAD_REQUEST,
+):
+    """
+    Reject a new request that overlaps one of the student's pending/approved
+    requests, or that would take any semester it touches past
+    SEMESTER_REBATE_DAY_CAP. Both checks come from one range query on
+    (student_id, start_date, end_date) bounded to the affected semesters.
+    """
+    window = (semester_bounds(start_date)[0], semester_bounds(end_date)[1])
+    held = await _held_ranges(db, {student_id: window})
+    reason = _rule_violation(start_date, end_date, held[student_id])
+    if reason:
+        raise HTTPException(status_code=status_code, detail=reason)
+
+async def check_reactivations(db: AsyncSession, requests: Sequence) -> Set[int]:
+    """
+    Batch form of check_new_rebate_request for requests (rows with id,
+    student_id, start_date, end_date) being reactivated together: one query
+    for every student's held ranges, then the requests are taken in order,
+    each one also checked against those accepted before it. Returns the ids
+    that would overlap or exceed the semester cap.
+    """
+    windows = {}
+    for r in requests:
+        lo, hi = semester_bounds(r.start_date)[0], semester_bounds(r.end_date)[1]
+        if r.student_id in windows:
+            lo, hi = min(lo, windows[r.student_id][0]), max(hi, windows[r.student_id][1])
+        windows[r.student_id] = (lo, hi)
+    held = await _held_ranges(db, windows)
+
+    conflicts = set()
+    for r in requests:
+        if _rule_violation(r.start_date, r.end_date, held[r.student_id]):
+            conflicts.add(r.id)
+        else:
+            held[r.student_id].append((r.start_date, r.end_date))
+    return conflicts
+
+def reactivates(old_status: Optional[RequestStatus], new_status: RequestStatus) -> bool:
+    """A rejected request moving back to pending/approved takes its days again."""
+    return old_status not in ACTIVE_STATUSES and new_status in ACTIVE_STATUSES
+
+async def check_status_change(db: AsyncSession, rr: RebateRequest, new_status: RequestStatus):
+    """Run the new-request checks on a status change that reactivates `rr` (409 on a violation)."""
+    if reactivates(rr.status, new_status):
+        await check_new_rebate_request(db, rr.student_id, rr.start_date, rr.end_date, status.HTTP_409_CONFLICT)
+
+async def commit_rebate_change(db: AsyncSession, status_code: int = status.HTTP_409_CONFLICT):
+    """
+    Commit a create or status change, turning an OVERLAP_CONSTRAINT
+    violation (a concurrent overlapping write on PostgreSQL) into an HTTP
+    error instead of a 500.
+    """
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if OVERLAP_CONSTRAINT not in str(exc.orig):
+            raise
+        raise HTTPException(status_code=status_code, detail="Dates overlap an existing rebate request.")
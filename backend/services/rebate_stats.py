@@ -0,0 +1,207 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select, update, delete, insert, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import UPSERT_INSERTS
+from models import User, UserRole, RebateRequest, RequestStatus, StudentRebateStats
+from services.auth_service import forget_users_after_commit
+from services.cache import cache, get_json, set_json
+
+DASHBOARD_STATS_CACHE_KEY = "admin:dashboard-stats"
+
+_STATUS_COUNTERS = {
+    RequestStatus.PENDING: "pending_requests",
+    RequestStatus.APPROVED: "approved_requests",
+    RequestStatus.REJECTED: "rejected_requests",
+}
+
+_COUNTER_COLUMNS = (
+    "total_requests",
+    "pending_requests",
+    "approved_requests",
+    "rejected_requests",
+    "total_days",
+    "approved_days",
+)
+
+def _deltas(total_days: int, old_status: Optional[RequestStatus], new_status: RequestStatus) -> dict:
+    """Counter changes for a request moving from `old_status` (None = new request) to `new_status`."""
+    deltas = defaultdict(int)
+    if old_status is None:
+        deltas["total_requests"] += 1
+        deltas["total_days"] += total_days
+    else:
+        deltas[_STATUS_COUNTERS[old_status]] -= 1
+        if old_status == RequestStatus.APPROVED:
+            deltas["approved_days"] -= total_days
+    deltas[_STATUS_COUNTERS[new_status]] += 1
+    if new_status == RequestStatus.APPROVED:
+        deltas["approved_days"] += total_days
+    return {k: v for k, v in deltas.items() if v}
+
+async def record_status_change(
+    db: AsyncSession,
+    student_id: int,
+    total_days: int,
+    old_status: Optional[RequestStatus],
+    new_status: RequestStatus,
+):
+    """
+    Apply a rebate request status change to the student's counters and to
+    User.total_rebate_days (approved days) inside the caller's transaction.
+    No-op when the status does not actually change.
+    """
+    await record_status_changes(db, [(student_id, total_days, old_status, new_status)])
+
+async def record_status_changes(
+    db: AsyncSession,
+    changes: Iterable[Tuple[int, int, Optional[RequestStatus], RequestStatus]],
+):
+    """
+    Batch form of record_status_change for `(student_id, total_days, old, new)`
+    tuples: deltas are summed per student, then applied with one multi-row
+    upsert and one grouped UPDATE of users.total_rebate_days.
+    """
+    per_student = defaultdict(lambda: defaultdict(int))
+    for student_id, total_days, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        for column, delta in _deltas(total_days, old_status, new_status).items():
+            per_student[student_id][column] += delta
+    if not per_student:
+        return
+
+    now = datetime.utcnow()
+    columns = list(_COUNTER_COLUMNS)
+    params = [
+        {"student_id": sid, "updated_at": now, **{c: deltas.get(c, 0) for c in columns}}
+        for sid, deltas in per_student.items()
+    ]
+
+    dialect_insert = UPSERT_INSERTS.get(db.bind.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(StudentRebateStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentRebateStats.student_id],
+            set_={
+                "updated_at": stmt.excluded.updated_at,
+                **{c: getattr(StudentRebateStats, c) + getattr(stmt.excluded, c) for c in columns},
+            },
+        )
+        await db.execute(stmt, params)
+    else:
+        for row in params:
+            result = await db.execute(
+                update(StudentRebateStats)
+                .where(StudentRebateStats.student_id == row["student_id"])
+                .values(updated_at=now, **{c: getattr(StudentRebateStats, c) + row[c] for c in columns})
+            )
+            if result.rowcount == 0:
+                db.add(StudentRebateStats(**row))
+
+    approved = {sid: d["approved_days"] for sid, d in per_student.items() if d.get("approved_days")}
+    if approved:
+        await db.execute(
+            update(User)
+            .where(User.id.in_(approved))
+            .values(
+                total_rebate_days=func.coalesce(User.total_rebate_days, 0)
+                + case(approved, value=User.id, else_=0)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        forget_users_after_commit(db, approved)
+
+async def cached_dashboard_stats(db: AsyncSession) -> dict:
+    """
+    Admin dashboard counts from a single statement over student_rebate_stats,
+    served from the cache for DASHBOARD_STATS_TTL_SECONDS between writes.
+    """
+    cached = await get_json(DASHBOARD_STATS_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    total_students = (
+        select(func.count(User.id)).where(User.role == UserRole.STUDENT).scalar_subquery()
+    )
+    row = (await db.execute(
+        select(
+            total_students,
+            func.coalesce(func.sum(StudentRebateStats.pending_requests), 0),
+            func.coalesce(func.sum(StudentRebateStats.approved_requests), 0),
+            func.coalesce(func.sum(StudentRebateStats.rejected_requests), 0),
+            func.coalesce(func.sum(StudentRebateStats.approved_days), 0),
+        )
+    )).one()
+    students, pending, approved, rejected, approved_days = (int(v or 0) for v in row)
+
+    stats = {
+        "total_students": students,
+        "pending_requests": pending,
+        "approved_requests": approved,
+        "rejected_requests": rejected,
+        "total_requests": pending + approved + rejected,
+        "total_approved_rebate_days": approved_days,
+    }
+    await set_json(DASHBOARD_STATS_CACHE_KEY, stats, settings.DASHBOARD_STATS_TTL_SECONDS)
+    return stats
+
+async def invalidate_dashboard_stats():
+    """Drop cached dashboard counts; call after committing a request or student change."""
+    await cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+def rebuild_student_rebate_stats(db: Session) -> int:
+    """
+    Recompute student_rebate_stats and User.total_rebate_days from
+    rebate_requests in one pass. Returns the number of students rebuilt.
+    """
+    totals = (
+        select(
+            RebateRequest.student_id,
+            func.count(RebateRequest.id),
+            func.sum(case((RebateRequest.status == RequestStatus.PENDING, 1), else_=0)),
+            func.sum(case((RebateRequest.status == RequestStatus.APPROVED, 1), else_=0)),
+            func.sum(case((RebateRequest.status == RequestStatus.REJECTED, 1), else_=0)),
+            func.coalesce(func.sum(RebateRequest.total_days), 0),
+            func.coalesce(func.sum(
+                case((RebateRequest.status == RequestStatus.APPROVED, RebateRequest.total_days), else_=0)
+            ), 0),
+            func.now(),
+        )
+        .group_by(RebateRequest.student_id)
+    )
+
+    db.execute(delete(StudentRebateStats))
+    result = db.execute(
+        insert(StudentRebateStats).from_select(
+            [
+                "student_id",
+                "total_requests",
+                "pending_requests",
+                "approved_requests",
+                "rejected_requests",
+                "total_days",
+                "approved_days",
+                "updated_at",
+            ],
+            totals,
+        )
+    )
+    db.execute(
+        update(User).values(
+            data_version=User.data_version + 1,
+            total_rebate_days=func.coalesce(
+                select(StudentRebateStats.approved_days)
+                .where(StudentRebateStats.student_id == User.id)
+                .scalar_subquery(),
+                0,
+            )
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,69 @@
+from typing import Iterable, List
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+from models import RebateRequest, MessBill
+from services.documents import document_url
+
+# schemas.RebateRequest's fields, in its order, selected as plain columns
+REBATE_REQUEST_COLUMNS = (
+    RebateRequest.start_date,
+    RebateRequest.end_date,
+    RebateRequest.reason,
+    RebateRequest.id,
+    RebateRequest.student_id,
+    RebateRequest.total_days,
+    RebateRequest.status,
+    RebateRequest.document_path,
+    RebateRequest.admin_remarks,
+    RebateRequest.processed_by,
+    RebateRequest.processed_at,
+    RebateRequest.created_at,
+)
+_REBATE_REQUEST_KEYS = tuple(c.key for c in REBATE_REQUEST_COLUMNS)
+
+# schemas.MessBill's fields, in its order
+MESS_BILL_COLUMNS = (
+    MessBill.month,
+    MessBill.total_amount,
+    MessBill.rebate_amount,
+    MessBill.final_amount,
+    MessBill.id,
+    MessBill.student_id,
+    MessBill.is_paid,
+    MessBill.payment_date,
+    MessBill.created_at,
+)
+_MESS_BILL_KEYS = tuple(c.key for c in MESS_BILL_COLUMNS)
+_MESS_BILL_AMOUNTS = ("total_amount", "rebate_amount", "final_amount")
+
+def rebate_request_items(rows: Iterable) -> List[dict]:
+    """Rows of REBATE_REQUEST_COLUMNS as schemas.RebateRequest-shaped dicts."""
+    items = []
+    for row in rows:
+        item = dict(zip(_REBATE_REQUEST_KEYS, row))
+        item["document_url"] = document_url(item["id"]) if item["document_path"] else None
+        items.append(item)
+    return items
+
+def mess_bill_items(rows: Iterable) -> List[dict]:
+    """Rows of MESS_BILL_COLUMNS as schemas.MessBill-shaped dicts (amounts as floats)."""
+    items = []
+    for row in rows:
+        item = dict(zip(_MESS_BILL_KEYS, row))
+        for key in _MESS_BILL_AMOUNTS:
+            item[key] = float(item[key] or 0)
+        items.append(item)
+    return items
+
+def json_response(content, response: Response) -> ORJSONResponse:
+    """
+    Encode `content` (a list endpoint's items, or a composite document)
+    straight to JSON bytes with orjson. Returning a Response skips the
+    response_model validation and jsonable_encoder passes, so content must
+    already have the documented shape; dates, datetimes and enums come out
+    as FastAPI would write them. Headers set on the injected `response`
+    (X-Next-Cursor, ETag) are carried over.
+    """
+    return ORJSONResponse(content, headers=dict(response.headers))
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def content_key(sha256: str) -> str:
+    """Storage key of a blob: fanned out on the first two hex digits."""
+    return f"{sha256[:2]}/{sha256}"
+
+def thumbnail_key(sha256: str, width: int) -> str:
+    """Storage key of a blob's JPEG preview at `width` pixels."""
+    return f"thumbs/{sha256[:2]}/{sha256}-{width}.jpg"
+
+class StorageBackend(ABC):
+    """Blob store interface. Keys come from content_key(); blobs are immutable."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def put_file(self, key: str, source_path: str, content_type: str):
+        """Store the file at `source_path` under `key`. Leaves `source_path` in place."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def fetch(self, key: str, dest_path: str):
+        """Copy the blob to a local file."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of the blob when the backend has one (enables sendfile)."""
+        return None
+
+    async def download_url(self, key: str, content_type: str) -> Optional[str]:
+        """Short-lived URL clients can fetch the blob from directly, if the backend offers one."""
+        return None
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def staging_dir(self) -> str:
+        # Temp files live next to the blobs so the final link stays on one filesystem
+        path = os.path.join(self.root, ".staging")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(os.path.exists, self.local_path(key))
+
+    async def put_file(self, key: str, source_path: str, content_type: str):
+        def _put():
+            dest = self.local_path(key)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            try:
+                # Staged on the same filesystem, so this is an atomic hard link
+                os.link(source_path, dest)
+            except FileExistsError:
+                pass
+            except OSError:
+                partial = f"{dest}.{os.getpid()}.partial"
+                shutil.copyfile(source_path, partial)
+                os.replace(partial, dest)
+        await run_in_threadpool(_put)
+
+    async def delete(self, key: str):
+        try:
+            await run_in_threadpool(os.remove, self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    async def fetch(self, key: str, dest_path: str):
+        await run_in_threadpool(shutil.copyfile, self.local_path(key), dest_path)
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible object store. Accepts any client with the boto3 S3
+    head_object / upload_file / download_file / delete_object /
+    generate_presigned_url interface, so MinIO or a moto server can stand
+    in locally.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str = "documents/"):
+        self._client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    async def put_file(self, key: str, source_path: str, content_type: str):
+        await asyncio.to_thread(
+            self._client.upload_file,
+            source_path,
+            self.bucket,
+            self._object_key(key),
+            ExtraArgs={"ContentType": content_type},
+        )
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=self._object_key(key))
+
+    async def fetch(self, key: str, dest_path: str):
+        await asyncio.to_thread(self._client.download_file, self.bucket, self._object_key(key), dest_path)
+
+    async def download_url(self, key: str, content_type: str) -> str:
+        # The object store then handles Range and conditional requests itself
+        return await asyncio.to_thread(
+            self._client.generate_presigned_url,
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key), "ResponseContentType": content_type},
+            ExpiresIn=settings.S3_URL_EXPIRE_SECONDS,
+        )
+
+def _build_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.UPLOAD_DIR)
+    if settings.STORAGE_BACKEND == "s3":
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 but the 'boto3' package is not installed")
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+        return S3Storage(client, settings.S3_BUCKET)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}'")
+
+storage = _build_storage()
+
+@dataclass
+class SpooledUpload:
+    path: str       # temp file holding the upload; remove with discard()
+    sha256: str
+    size: int
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> SpooledUpload:
+    """
+    Copy an upload to a temp file UPLOAD_CHUNK_SIZE at a time, hashing as it
+    goes. Disk writes run in the threadpool, and the upload is rejected with
+    413 as soon as it passes `max_bytes`.
+    """
+    staging = storage.staging_dir() if isinstance(storage, LocalStorage) else None
+    fd, path = tempfile.mkstemp(dir=staging, suffix=".upload")
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds the {max_bytes // (1024 * 1024)} MB limit.",
+                )
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        out.close()
+        os.remove(path)
+        raise
+    await run_in_threadpool(out.close)
+    return SpooledUpload(path=path, sha256=digest.hexdigest(), size=size)
@@ -0,0 +1,120 @@
+"""
+Shared fixtures. The app runs in-process against a throwaway SQLite file
+(both the sync and async engines need to see the same database, which an
+in-memory URL would not give them), created before anything imports config.
+"""
+import contextlib
+import datetime as dt
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="rebate-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP, "uploads")
+os.environ["OTP_PURGE_INTERVAL_SECONDS"] = "0"
+os.environ["DOCUMENT_GC_INTERVAL_SECONDS"] = "0"
+os.environ["SQL_PROFILING_ENABLED"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from database import Base, SessionLocal, engine, async_engine, write_engine
+from models import User, UserRole, RebateRequest, RequestStatus
+from services.auth_service import create_user_token, user_cache
+from services.otp import otp_failures, otp_throttle
+from services.rebate_stats import rebuild_student_rebate_stats, invalidate_dashboard_stats
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture(autouse=True)
+def clean_db(client):
+    """Every test starts from empty tables and caches."""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    user_cache.clear()
+    otp_failures._failures.clear()
+    otp_throttle._buckets.clear()
+    client.portal.call(invalidate_dashboard_stats)
+    yield
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def auth(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_user_token(user)}"}
+
+def add_students(db, count: int, requests_each: int = 3, start: int = 0):
+    """`count` verified students across two hostels, each with pending/approved/rejected requests."""
+    statuses = [RequestStatus.PENDING, RequestStatus.APPROVED, RequestStatus.REJECTED]
+    students = []
+    for i in range(start, start + count):
+        student = User(
+            email=f"student{i}@hall6.ac.in",
+            name=f"Student {i}",
+            roll_number=f"R{i:05d}",
+            hostel="H1" if i % 2 else "H2",
+            room_number=str(100 + i),
+            role=UserRole.STUDENT,
+            is_verified=True,
+        )
+        db.add(student)
+        students.append(student)
+    db.flush()
+    for student in students:
+        for k in range(requests_each):
+            db.add(RebateRequest(
+                student_id=student.id,
+                start_date=dt.date(2025, 1, 1 + k * 5),
+                end_date=dt.date(2025, 1, 3 + k * 5),
+                total_days=3,
+                reason="Home visit",
+                status=statuses[k % 3],
+            ))
+    db.commit()
+    rebuild_student_rebate_stats(db)
+    return students
+
+@pytest.fixture
+def admin(db):
+    user = User(email="warden@hall6.ac.in", name="Admin", role=UserRole.ADMIN, is_verified=True)
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager counting the SQL statements run on every engine while
+    it is open (scripts/benchmark.py counts the same way, per request).
+    """
+    engines = [engine, async_engine.sync_engine, write_engine.sync_engine]
+
+    @contextlib.contextmanager
+    def counting():
+        counter = [0]
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            counter[0] += 1
+
+        for target in set(engines):
+            event.listen(target, "before_cursor_execute", count)
+        try:
+            yield counter
+        finally:
+            for target in set(engines):
+                event.remove(target, "before_cursor_execute", count)
+
+    return counting
@@ -0,0 +1,109 @@
+import datetime as dt
+
+from conftest import add_students, auth
+from models import RebateRequest, RequestStatus, StudentRebateStats, User, UserRole
+from services.rebate_stats import rebuild_student_rebate_stats
+
+def _requests(db, student):
+    return db.query(RebateRequest).filter(RebateRequest.student_id == student.id).order_by(RebateRequest.id).all()
+
+def _batch(client, admin, request_ids, decision="approve"):
+    response = client.post(
+        "/api/admin/rebate-requests/batch",
+        headers=auth(admin),
+        json={"request_ids": request_ids, "decision": decision},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _rejected(db, student, *ranges):
+    rows = [
+        RebateRequest(
+            student_id=student.id,
+            start_date=start,
+            end_date=end,
+            total_days=(end - start).days + 1,
+            reason="Home visit",
+            status=RequestStatus.REJECTED,
+        )
+        for start, end in ranges
+    ]
+    db.add_all(rows)
+    db.commit()
+    rebuild_student_rebate_stats(db)
+    return [r.id for r in rows]
+
+def _counters(db):
+    db.expire_all()
+    stats = {
+        s.student_id: tuple(getattr(s, c) for c in (
+            "total_requests", "pending_requests", "approved_requests", "rejected_requests", "total_days", "approved_days",
+        ))
+        for s in db.query(StudentRebateStats)
+    }
+    days = dict(db.query(User.id, User.total_rebate_days).filter(User.role == UserRole.STUDENT))
+    return stats, days
+
+def test_batch_reports_each_request(client, db, admin):
+    student = add_students(db, 1)[0]
+    pending, approved, rejected = [r.id for r in _requests(db, student)]
+
+    body = _batch(client, admin, [pending, approved, rejected, 999999, pending])
+
+    assert body["updated"] == 2
+    assert [r["result"] for r in body["results"]] == ["updated", "unchanged", "updated", "not_found"]
+    db.expire_all()
+    assert {r.status for r in _requests(db, student)} == {RequestStatus.APPROVED}
+
+def test_batch_rejects_requests_overlapping_each_other(client, db, admin):
+    student = add_students(db, 1)[0]
+    first, second, separate, existing = _rejected(
+        db,
+        student,
+        (dt.date(2025, 2, 1), dt.date(2025, 2, 5)),
+        (dt.date(2025, 2, 4), dt.date(2025, 2, 8)),
+        (dt.date(2025, 2, 10), dt.date(2025, 2, 12)),
+        (dt.date(2025, 1, 2), dt.date(2025, 1, 4)),  # overlaps the pending January request
+    )
+
+    body = _batch(client, admin, [first, second, separate, existing])
+
+    assert [r["result"] for r in body["results"]] == ["updated", "conflict", "updated", "conflict"]
+    db.expire_all()
+    assert db.get(RebateRequest, second).status == RequestStatus.REJECTED
+    assert db.get(RebateRequest, existing).status == RequestStatus.REJECTED
+
+def test_batch_rejects_requests_past_the_semester_cap_together(client, db, admin, monkeypatch):
+    from config import settings
+    monkeypatch.setattr(settings, "SEMESTER_REBATE_DAY_CAP", 10)
+    student = add_students(db, 1, requests_each=2)[0]  # 6 days held
+    fits, over = _rejected(
+        db,
+        student,
+        (dt.date(2025, 3, 1), dt.date(2025, 3, 4)),
+        (dt.date(2025, 3, 10), dt.date(2025, 3, 10)),
+    )
+    assert [r["result"] for r in _batch(client, admin, [fits, over])["results"]] == ["updated", "conflict"]
+
+def test_batch_reactivation_check_is_one_query(client, db, admin, count_queries):
+    def statements(students):
+        ids = [r.id for s in students for r in _requests(db, s) if r.status == RequestStatus.REJECTED]
+        with count_queries() as counter:
+            assert _batch(client, admin, ids)["updated"] == len(ids)
+        return counter[0]
+
+    _batch(client, admin, [0])  # warm the admin into the user cache
+    few = statements(add_students(db, 2))
+    assert statements(add_students(db, 20, start=2)) == few
+
+def test_batch_counters_match_a_rebuild(client, db, admin):
+    students = add_students(db, 4)
+    ids = [r.id for s in students for r in _requests(db, s)]
+
+    _batch(client, admin, ids[::2], "reject")
+    _batch(client, admin, ids, "approve")
+    _batch(client, admin, ids[1::3], "reject")
+
+    incremental = _counters(db)
+    rebuild_student_rebate_stats(db)
+    assert _counters(db) == incremental
@@ -0,0 +1,59 @@
+import argparse
+import random
+from collections import defaultdict
+
+import pytest
+from sqlalchemy import select
+
+from models import RebateRequest, User
+from scripts import benchmark
+from scripts.seed_data import HOSTELS, clear_seeded, seed
+from services.otp import otp_throttle
+from services.rebate_stats import rebuild_student_rebate_stats
+
+def _snapshot(db):
+    return db.execute(
+        select(User.email, User.hostel, RebateRequest.start_date, RebateRequest.end_date, RebateRequest.status)
+        .join(RebateRequest, RebateRequest.student_id == User.id)
+        .order_by(User.email, RebateRequest.start_date)
+    ).all()
+
+def test_seed_is_deterministic_and_non_overlapping(db):
+    assert seed(db, 24, 200, 4, random.Random(7)) == (24, 200)
+    first = _snapshot(db)
+
+    by_student = defaultdict(list)
+    for email, hostel, start, end, _ in first:
+        by_student[email].append((start, end))
+    for ranges in by_student.values():
+        ranges.sort()
+        assert all(prev_end < start for (_, prev_end), (start, _) in zip(ranges, ranges[1:]))
+    assert {hostel for _, hostel, *_ in first} == set(HOSTELS)
+
+    clear_seeded(db)
+    seed(db, 24, 200, 4, random.Random(7))
+    assert _snapshot(db) == first
+
+@pytest.mark.parametrize("pct, expected", [(50, 5), (95, 10), (99, 10), (0, 1), (10, 1), (11, 2)])
+def test_percentile_is_nearest_rank(pct, expected):
+    assert benchmark.percentile(list(range(1, 11)), pct) == expected
+
+def test_benchmark_reports_every_endpoint(client, db, monkeypatch):
+    seed(db, 10, 40, 2, random.Random(1))
+    rebuild_student_rebate_stats(db)
+    monkeypatch.setattr(otp_throttle, "burst", 10 ** 6)
+    args = argparse.Namespace(
+        seed=3, students=5, endpoints=None, base_url=None, timeout=30.0,
+        warmup=2, requests=6, concurrency=3,
+    )
+    report = client.portal.call(benchmark.run, args)
+
+    assert report["meta"]["database"] == "sqlite"
+    assert set(report["endpoints"]) == {
+        "auth_login", "student_rebate_requests", "admin_students", "admin_rebate_requests", "admin_dashboard_stats",
+    }
+    for name, result in report["endpoints"].items():
+        assert result["errors"] == 0, name
+        assert result["requests"] == 6
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+        assert result["queries_per_request"] > 0 or name == "admin_dashboard_stats"
@@ -0,0 +1,63 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import add_students, auth
+
+def _create_request(client, student, admin):
+    response = client.post(
+        "/api/students/rebate-requests",
+        headers=auth(student),
+        json={"start_date": "2025-03-01", "end_date": "2025-03-03", "reason": "Home visit"},
+    )
+    assert response.status_code == 200, response.text
+
+def _generate_bills(client, student, admin):
+    response = client.post("/api/admin/bills/generate", headers=auth(admin), params={"month": 3, "year": 2025})
+    assert response.status_code == 200, response.text
+
+def _edit_profile(client, student, admin):
+    assert client.put("/api/students/profile", headers=auth(student), json={"room_number": "B-12"}).status_code == 200
+
+ENDPOINTS = [
+    ("/api/students/profile", _edit_profile),
+    ("/api/students/rebate-requests", _create_request),
+    ("/api/students/rebate-summary", _create_request),
+    ("/api/students/mess-bills", _generate_bills),
+    ("/api/students/home", _create_request),
+    ("/api/students/home", _edit_profile),
+    ("/api/students/home?fields=summary", _create_request),
+]
+
+@pytest.mark.parametrize("url,write", ENDPOINTS)
+def test_matching_etag_is_304_until_a_write(client, db, admin, url, write):
+    student = add_students(db, 1)[0]
+    first = client.get(url, headers=auth(student))
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = client.get(url, headers={**auth(student), "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    write(client, student, admin)
+    fresh = client.get(url, headers={**auth(student), "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json() != first.json()
+
+def test_if_modified_since_is_ignored_with_if_none_match(client, db, admin):
+    """Two writes within one second share a Last-Modified; only the ETag tells them apart."""
+    student = add_students(db, 1)[0]
+    first = client.get("/api/students/home", headers=auth(student))
+    _create_request(client, student, admin)
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(minutes=1), usegmt=True)
+
+    stale = {**auth(student), "If-None-Match": first.headers["etag"], "If-Modified-Since": later}
+    assert client.get("/api/students/home", headers=stale).status_code == 200
+
+    # On its own, If-Modified-Since is still honoured
+    since_only = {**auth(student), "If-Modified-Since": later}
+    assert client.get("/api/students/home", headers=since_only).status_code == 304
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import os
+
+from conftest import add_students, auth
+from database import AsyncWriteSessionLocal
+from models import RebateRequest, StoredDocument
+from scripts.backfill_documents import run as backfill_documents
+from services.documents import collect_released_documents
+from services.storage import LocalStorage, content_key, storage
+
+PDF = b"%PDF-1.4 rebate supporting document"
+
+def _upload(client, student, request_id: int, content: bytes = PDF):
+    return client.post(
+        f"/api/students/rebate-requests/{request_id}/upload-document",
+        headers=auth(student),
+        files={"file": ("ticket.pdf", content, "application/pdf")},
+    )
+
+def test_uploads_are_stored_once_and_served(client, db):
+    student = add_students(db, 1, requests_each=2)[0]
+    first, second = [rr.id for rr in db.query(RebateRequest).order_by(RebateRequest.id)]
+
+    assert _upload(client, student, first).status_code == 200
+    assert _upload(client, student, second).status_code == 200
+
+    document = db.query(StoredDocument).one()
+    assert document.ref_count == 2
+    assert document.sha256 == hashlib.sha256(PDF).hexdigest()
+    response = client.get(f"/api/documents/rebate-requests/{second}", headers=auth(student))
+    assert response.status_code == 200
+    assert response.content == PDF
+    if isinstance(storage, LocalStorage):
+        assert os.listdir(storage.staging_dir()) == []
+
+def test_released_blobs_are_collected_after_the_grace_period(client, db):
+    student = add_students(db, 1, requests_each=1)[0]
+    request_id = db.query(RebateRequest.id).scalar()
+    _upload(client, student, request_id)
+    old = db.query(StoredDocument).one()
+
+    assert _upload(client, student, request_id, b"%PDF-1.4 another").status_code == 200
+    db.expire_all()
+    assert (old.ref_count, old.released_at is not None) == (0, True)
+    assert client.portal.call(storage.exists, old.storage_key)
+
+    def collect(grace_seconds):
+        async def run():
+            async with AsyncWriteSessionLocal() as session:
+                return await collect_released_documents(session, grace_seconds)
+        return client.portal.call(run)
+
+    assert collect(3600) == []
+    assert collect(0) == [old.storage_key]
+    assert not client.portal.call(storage.exists, old.storage_key)
+    db.expire_all()
+    assert db.query(StoredDocument).count() == 1
+
+def test_reupload_takes_back_a_released_blob(client, db, monkeypatch):
+    student = add_students(db, 1, requests_each=1)[0]
+    request_id = db.query(RebateRequest.id).scalar()
+    _upload(client, student, request_id)
+    _upload(client, student, request_id, b"%PDF-1.4 another")
+    puts = []
+    put_file = storage.put_file
+
+    async def counting_put_file(key, source_path, content_type):
+        puts.append(key)
+        await put_file(key, source_path, content_type)
+
+    monkeypatch.setattr(storage, "put_file", counting_put_file)
+    assert _upload(client, student, request_id).status_code == 200
+
+    assert puts == []  # the released copy was still there to take back
+    db.expire_all()
+    document = db.get(StoredDocument, hashlib.sha256(PDF).hexdigest())
+    assert (document.ref_count, document.released_at) == (1, None)
+
+    async def run():
+        async with AsyncWriteSessionLocal() as session:
+            return await collect_released_documents(session, 0)
+    assert client.portal.call(run) == [content_key(hashlib.sha256(b"%PDF-1.4 another").hexdigest())]
+    assert client.portal.call(storage.exists, document.storage_key)
+
+def test_backfill_adopts_legacy_documents(client, db, tmp_path):
+    student = add_students(db, 1, requests_each=2)[0]
+    legacy, missing = db.query(RebateRequest).order_by(RebateRequest.id).all()
+    legacy_file = tmp_path / "0b7c1f.pdf"
+    legacy_file.write_bytes(PDF)
+    legacy.document_path = str(legacy_file)
+    missing.document_path = str(tmp_path / "gone.pdf")
+    db.commit()
+    assert client.get(f"/api/documents/rebate-requests/{legacy.id}", headers=auth(student)).status_code == 404
+
+    assert client.portal.call(backfill_documents) == (1, 1)
+
+    response = client.get(f"/api/documents/rebate-requests/{legacy.id}", headers=auth(student))
+    assert response.status_code == 200
+    assert response.content == PDF
+    assert legacy_file.exists()
+    assert client.portal.call(backfill_documents) == (0, 1)
+
+def _png() -> bytes:
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (400, 300), (200, 30, 30)).save(out, "PNG")
+    return out.getvalue()
+
+def test_admin_viewer_opens_documents_by_url(client, db, admin):
+    """The viewer's <iframe>/<img> load document_url with the token in the query, no header."""
+    student, other = add_students(db, 2, requests_each=1)
+    request_id = db.query(RebateRequest.id).filter(RebateRequest.student_id == student.id).scalar()
+    png = _png()
+    response = client.post(
+        f"/api/students/rebate-requests/{request_id}/upload-document",
+        headers=auth(student),
+        files={"file": ("ticket.png", png, "image/png")},
+    )
+    assert response.status_code == 200
+
+    row = next(r for r in client.get("/api/admin/rebate-requests", headers=auth(admin)).json() if r["id"] == request_id)
+    token = auth(admin)["Authorization"].split()[1]
+
+    document = client.get(row["document_url"], params={"access_token": token})
+    assert document.status_code == 200
+    assert document.content == png
+    thumbnail = client.get(row["thumbnail_url"], params={"access_token": token, "width": 160})
+    assert thumbnail.status_code == 200
+    assert thumbnail.headers["content-type"] == "image/jpeg"
+
+    assert client.get(row["document_url"]).status_code == 401
+    other_token = auth(other)["Authorization"].split()[1]
+    assert client.get(row["document_url"], params={"access_token": other_token}).status_code == 404
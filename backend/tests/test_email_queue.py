@@ -0,0 +1,136 @@
+"""
+Delivery through EmailQueue against a stand-in SMTP server on localhost:
+a small line-based server that accepts mail, except for recipients it is
+told to refuse permanently (550) or temporarily (451).
+"""
+import asyncio
+import socketserver
+import threading
+import time
+
+import pytest
+
+from config import settings
+from services.email_service import EmailQueue, EmailService
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        self.reply("220 stand-in ESMTP")
+        recipient = None
+        while True:
+            line = self.rfile.readline().decode().rstrip("\r\n")
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 stand-in")
+            elif verb == "MAIL":
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipient = line.split(":", 1)[1].strip().strip("<>")
+                server.attempts.append(recipient)
+                if recipient in server.refuse:
+                    self.reply("550 No such user")
+                elif server.defer.get(recipient, 0) > 0:
+                    server.defer[recipient] -= 1
+                    self.reply("451 Try again later")
+                else:
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                server.delivered.append(recipient)
+                self.reply("250 Queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.attempts, server.delivered, server.refuse, server.defer = [], [], set(), {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def service(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BACKOFF_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 3)
+    svc = EmailService()
+    svc.smtp_server, svc.smtp_port = smtp_server.server_address
+    svc.use_tls, svc.username, svc.password = False, None, None
+    svc.from_email = "mess@hall6.ac.in"
+    return svc
+
+def _deliver(service: EmailService, recipients, timeout: float = 5.0) -> int:
+    """Queue one OTP email per recipient, let the queue drain and return what was left."""
+    async def run():
+        queue = EmailQueue(service)
+        queue.start()
+        for to_email in recipients:
+            queue.enqueue(service.build_otp_email(to_email, "123456"))
+        await queue.stop(timeout)
+        return queue.qsize()
+    return asyncio.run(run())
+
+def test_queued_mail_is_delivered(smtp_server, service):
+    assert _deliver(service, ["a@hall6.ac.in", "b@hall6.ac.in"]) == 0
+    assert smtp_server.delivered == ["a@hall6.ac.in", "b@hall6.ac.in"]
+
+def test_permanent_rejection_is_not_retried(smtp_server, service):
+    smtp_server.refuse.add("gone@hall6.ac.in")
+    assert _deliver(service, ["gone@hall6.ac.in", "ok@hall6.ac.in"]) == 0
+    assert smtp_server.attempts.count("gone@hall6.ac.in") == 1
+    assert smtp_server.delivered == ["ok@hall6.ac.in"]
+
+def test_temporary_failure_is_retried_after_backoff(smtp_server, service):
+    smtp_server.defer["busy@hall6.ac.in"] = 1
+    started = time.monotonic()
+    assert _deliver(service, ["busy@hall6.ac.in"]) == 0
+    assert smtp_server.attempts.count("busy@hall6.ac.in") == 2
+    assert smtp_server.delivered == ["busy@hall6.ac.in"]
+    assert time.monotonic() - started >= settings.EMAIL_RETRY_BACKOFF_SECONDS
+
+def test_retry_backoff_does_not_hold_up_new_mail(smtp_server, service, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BACKOFF_SECONDS", 30.0)
+    smtp_server.defer["busy@hall6.ac.in"] = 1
+
+    async def run():
+        queue = EmailQueue(service)
+        queue.start()
+        queue.enqueue(service.build_otp_email("busy@hall6.ac.in", "111111"))
+        started = time.monotonic()
+        while "busy@hall6.ac.in" not in smtp_server.attempts:
+            assert time.monotonic() - started < 5
+            await asyncio.sleep(0.01)
+        started = time.monotonic()
+        queue.enqueue(service.build_otp_email("next@hall6.ac.in", "222222"))
+        while "next@hall6.ac.in" not in smtp_server.delivered:
+            assert time.monotonic() - started < 5
+            await asyncio.sleep(0.01)
+        assert queue.qsize() == 1  # the deferred retry
+        await queue.stop(0.1)
+
+    asyncio.run(run())
+    assert smtp_server.delivered == ["next@hall6.ac.in"]
+
+def test_connection_failure_is_retried_then_given_up(service, capsys):
+    service.smtp_port = 1  # nothing listens there
+    assert _deliver(service, ["a@hall6.ac.in"]) == 0
+    out = capsys.readouterr().out
+    assert "SMTP connection error" in out
+    assert "rejected" not in out
+    assert "Giving up on email to a@hall6.ac.in after 3 attempts" in out
@@ -0,0 +1,85 @@
+import datetime as dt
+
+from conftest import add_students, auth
+from models import HostelDailyHeadcount, RebateRequest, RequestStatus
+from services.headcount import daily_counts, rebuild_hostel_headcounts
+
+def _rollup(db):
+    db.expire_all()
+    return {(r.hostel, r.day): (r.approved, r.pending) for r in db.query(HostelDailyHeadcount)}
+
+def _assert_matches_rebuild(db):
+    incremental = _rollup(db)
+    rebuild_hostel_headcounts(db)
+    assert _rollup(db) == incremental
+
+def test_daily_counts_sums_overlapping_ranges():
+    counts = daily_counts([
+        ("H1", dt.date(2025, 1, 1), dt.date(2025, 1, 3), 1, 0),
+        ("H1", dt.date(2025, 1, 3), dt.date(2025, 1, 4), 0, 1),
+        ("H2", dt.date(2025, 1, 2), dt.date(2025, 1, 2), 1, 0),
+        ("H1", dt.date(2025, 1, 4), dt.date(2025, 1, 4), 0, -1),
+    ])
+    assert counts == {
+        ("H1", dt.date(2025, 1, 1)): (1, 0),
+        ("H1", dt.date(2025, 1, 2)): (1, 0),
+        ("H1", dt.date(2025, 1, 3)): (1, 1),
+        ("H2", dt.date(2025, 1, 2)): (1, 0),
+    }
+    assert daily_counts([]) == {}
+
+def test_incremental_rollup_matches_rebuild(client, db, admin):
+    students = add_students(db, 4)
+    rebuild_hostel_headcounts(db)
+    student = students[0]
+
+    response = client.post(
+        "/api/students/rebate-requests",
+        headers=auth(student),
+        json={"start_date": "2025-03-01", "end_date": "2025-03-05", "reason": "Home visit"},
+    )
+    assert response.status_code == 200, response.text
+    created = response.json()["id"]
+    _assert_matches_rebuild(db)
+
+    ids = [r.id for r in db.query(RebateRequest).order_by(RebateRequest.id)]
+    response = client.post(
+        "/api/admin/rebate-requests/batch", headers=auth(admin), json={"request_ids": ids, "decision": "approve"}
+    )
+    assert response.status_code == 200
+    _assert_matches_rebuild(db)
+
+    assert client.post(f"/api/admin/requests/{created}/reject", headers=auth(admin), json={}).status_code == 200
+    _assert_matches_rebuild(db)
+
+    response = client.put(f"/api/admin/rebate-requests/{created}", headers=auth(admin), json={"status": "pending"})
+    assert response.status_code == 200, response.text
+    _assert_matches_rebuild(db)
+
+    assert client.put("/api/students/profile", headers=auth(student), json={"hostel": "H3"}).status_code == 200
+    assert ("H3", dt.date(2025, 3, 1)) in _rollup(db)
+    _assert_matches_rebuild(db)
+
+    assert client.put("/api/students/profile", headers=auth(student), json={"hostel": ""}).status_code == 200
+    assert not any(hostel == "H3" for hostel, _ in _rollup(db))
+    _assert_matches_rebuild(db)
+
+def test_forecast_counts_active_students_on_both_sides(client, db, admin):
+    active, inactive = add_students(db, 2, requests_each=2)  # H2, H1
+    inactive.hostel = "H2"
+    inactive.is_active = False
+    db.commit()
+    rebuild_hostel_headcounts(db)
+
+    response = client.get(
+        "/api/admin/headcount-forecast",
+        headers=auth(admin),
+        params={"start": "2025-01-01", "end": "2025-01-08"},
+    )
+    assert response.status_code == 200
+    [hostel] = response.json()["hostels"]
+    assert hostel["hostel"] == "H2"
+    assert hostel["residents"] == 1
+    by_day = {d["date"]: d for d in hostel["days"]}
+    assert (by_day["2025-01-01"]["pending"], by_day["2025-01-06"]["approved"]) == (1, 1)
+    assert by_day["2025-01-06"]["expected"] == 0
@@ -0,0 +1,55 @@
+import asyncio
+
+from conftest import add_students, auth
+from config import settings
+from services.metrics import REQUESTS_IN_FLIGHT, MetricsMiddleware, registry
+
+def test_metrics_need_a_token_or_an_admin(client, db, admin, monkeypatch):
+    student = add_students(db, 1)[0]
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+
+    assert client.get("/metrics").status_code in (401, 403)
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers=auth(student)).status_code == 403
+    assert client.get("/metrics", headers=auth(admin)).status_code == 200
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "http_requests_in_flight" in response.text
+
+def _call(app, path: str):
+    """Run one GET through MetricsMiddleware; returns the in-flight gauge seen mid-response."""
+    seen = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            seen.append(REQUESTS_IN_FLIGHT._value.get())
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    asyncio.run(MetricsMiddleware(app)(scope, receive, send))
+    return seen[0]
+
+def _latency_count() -> float:
+    return sum(
+        sample.value
+        for metric in registry.collect() if metric.name == "http_request_duration_seconds"
+        for sample in metric.samples if sample.name.endswith("_count")
+    )
+
+def _app(content_type: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b"data: {}\n\n"})
+    return app
+
+def test_event_streams_are_not_counted_as_requests():
+    before, observed = REQUESTS_IN_FLIGHT._value.get(), _latency_count()
+    assert _call(_app(b"text/event-stream; charset=utf-8"), "/api/events/stream") == before
+    assert REQUESTS_IN_FLIGHT._value.get() == before
+    assert _latency_count() == observed
+
+    assert _call(_app(b"application/json"), "/health") == before + 1
+    assert REQUESTS_IN_FLIGHT._value.get() == before
+    assert _latency_count() == observed + 1
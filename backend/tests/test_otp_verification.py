@@ -0,0 +1,46 @@
+import datetime as dt
+
+from config import settings
+from models import OTP, User, UserRole
+
+def _student_with_otp(db, code: str = "123456") -> User:
+    user = User(email="student@hall6.ac.in", roll_number="R00001", role=UserRole.STUDENT, is_verified=True)
+    db.add(user)
+    db.flush()
+    db.add(OTP(user_id=user.id, otp_code=code, expires_at=dt.datetime.utcnow() + dt.timedelta(minutes=10)))
+    db.commit()
+    return user
+
+def _verify(client, code: str):
+    return client.post("/api/auth/verify-otp", json={"email": "student@hall6.ac.in", "otp_code": code})
+
+def test_correct_code_logs_in(client, db):
+    _student_with_otp(db)
+    assert _verify(client, "000000").status_code == 400
+    assert _verify(client, "123456").status_code == 200
+
+def test_repeated_failures_void_the_otp_and_lock_verification(client, db):
+    user = _student_with_otp(db)
+    for _ in range(settings.OTP_MAX_VERIFY_FAILURES - 1):
+        assert _verify(client, "000000").status_code == 400
+
+    response = _verify(client, "000000")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    db.expire_all()
+    assert all(otp.is_used for otp in db.query(OTP).filter(OTP.user_id == user.id))
+
+    # Even the right code is refused while locked, and it has been voided anyway
+    assert _verify(client, "123456").status_code == 429
+
+def test_success_resets_the_failure_count(client, db):
+    _student_with_otp(db)
+    for _ in range(settings.OTP_MAX_VERIFY_FAILURES - 1):
+        assert _verify(client, "000000").status_code == 400
+    assert _verify(client, "123456").status_code == 200
+
+    db.add(OTP(user_id=db.query(User).one().id, otp_code="654321",
+               expires_at=dt.datetime.utcnow() + dt.timedelta(minutes=10)))
+    db.commit()
+    assert _verify(client, "000000").status_code == 400
+    assert _verify(client, "654321").status_code == 200
@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import add_students, auth
+
+ADMIN_LISTS = [
+    "/api/admin/students",
+    "/api/admin/students/list",
+    "/api/admin/rebate-requests",
+    "/api/admin/requests",
+    "/api/students/rebate-requests",
+]
+
+def _statements(client, count_queries, url, headers) -> int:
+    """Statements for one warm call (the first call may load the caller into the user snapshot cache)."""
+    client.get(url, headers=headers)
+    with count_queries() as counter:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return counter[0]
+
+@pytest.mark.parametrize("url", ADMIN_LISTS)
+def test_admin_list_runs_one_statement(client, db, admin, count_queries, url):
+    add_students(db, 5)
+    assert _statements(client, count_queries, url, auth(admin)) == 1
+
+@pytest.mark.parametrize("url", ADMIN_LISTS)
+def test_admin_list_statements_do_not_grow_with_rows(client, db, admin, count_queries, url):
+    add_students(db, 3)
+    small = _statements(client, count_queries, url, auth(admin))
+    add_students(db, 30, start=3)
+    assert _statements(client, count_queries, url, auth(admin)) == small
+    assert _statements(client, count_queries, url + "?limit=10", auth(admin)) == small
@@ -0,0 +1,64 @@
+import datetime as dt
+
+from conftest import add_students, auth
+from config import settings
+from models import RebateRequest, RequestStatus
+
+def _create(client, student, start: dt.date, end: dt.date):
+    return client.post(
+        "/api/students/rebate-requests",
+        headers=auth(student),
+        json={"start_date": start.isoformat(), "end_date": end.isoformat(), "reason": "Home visit"},
+    )
+
+def _rejected_request(db, student) -> int:
+    return db.query(RebateRequest.id).filter(
+        RebateRequest.student_id == student.id, RebateRequest.status == RequestStatus.REJECTED
+    ).scalar()
+
+def test_create_overlapping_a_held_request_is_rejected(client, db):
+    student = add_students(db, 1)[0]  # pending Jan 1-3, approved Jan 6-8, rejected Jan 11-13
+
+    response = _create(client, student, dt.date(2025, 1, 3), dt.date(2025, 1, 5))
+    assert response.status_code == 400
+    assert "overlap" in response.json()["detail"]
+    assert _create(client, student, dt.date(2025, 1, 7), dt.date(2025, 1, 7)).status_code == 400
+    assert _create(client, student, dt.date(2025, 1, 12), dt.date(2025, 1, 14)).status_code == 200
+
+def test_reopening_an_overlapped_request_is_a_conflict(client, db, admin):
+    student = add_students(db, 1)[0]
+    rejected = _rejected_request(db, student)
+    assert _create(client, student, dt.date(2025, 1, 12), dt.date(2025, 1, 14)).status_code == 200
+
+    response = client.put(f"/api/admin/rebate-requests/{rejected}", headers=auth(admin), json={"status": "pending"})
+    assert response.status_code == 409
+    assert "overlap" in response.json()["detail"]
+    assert client.post(f"/api/admin/requests/{rejected}/approve", headers=auth(admin)).status_code == 409
+    db.expire_all()
+    assert db.get(RebateRequest, rejected).status == RequestStatus.REJECTED
+
+def test_semester_cap_boundary(client, db):
+    student = add_students(db, 1, requests_each=2)[0]  # 6 days held in January
+    assert _create(client, student, dt.date(2025, 2, 1), dt.date(2025, 3, 2)).status_code == 200  # 30 days
+    remaining = settings.SEMESTER_REBATE_DAY_CAP - 36
+    start = dt.date(2025, 3, 10)
+
+    response = _create(client, student, start, start + dt.timedelta(days=remaining))
+    assert response.status_code == 400
+    assert "limit" in response.json()["detail"]
+    assert _create(client, student, start, start + dt.timedelta(days=remaining - 1)).status_code == 200
+    assert _create(client, student, dt.date(2025, 6, 30), dt.date(2025, 6, 30)).status_code == 400
+    # The cap is per semester: July starts from zero
+    assert _create(client, student, dt.date(2025, 7, 1), dt.date(2025, 7, 1)).status_code == 200
+
+def test_reopening_past_the_semester_cap_is_a_conflict(client, db, admin):
+    student = add_students(db, 1)[0]  # 6 days held, 3 rejected
+    rejected = _rejected_request(db, student)
+    assert _create(client, student, dt.date(2025, 2, 1), dt.date(2025, 3, 2)).status_code == 200
+    start = dt.date(2025, 3, 10)
+    short_by_two = settings.SEMESTER_REBATE_DAY_CAP - 36 - 2
+    assert _create(client, student, start, start + dt.timedelta(days=short_by_two - 1)).status_code == 200
+
+    response = client.put(f"/api/admin/rebate-requests/{rejected}", headers=auth(admin), json={"status": "pending"})
+    assert response.status_code == 409
+    assert "limit" in response.json()["detail"]
@@ -0,0 +1,41 @@
+import datetime as dt
+import json
+from decimal import Decimal
+
+import pytest
+
+from conftest import add_students, auth
+from models import MessBill, RebateRequest
+from schemas import MessBill as MessBillSchema, RebateRequest as RebateRequestSchema
+from scripts.bench_serialization import _cases, _rows
+
+@pytest.mark.parametrize("case", ["student_rebate_requests", "admin_rebate_requests"])
+def test_fast_path_matches_the_response_model_path(case):
+    """The benchmark's before/after pair must produce the same document."""
+    pair = _cases(_rows(200, seed=5))[case]
+    assert json.loads(pair["after"]()) == json.loads(pair["before"]())
+
+def _schema_dump(schema, obj) -> dict:
+    return json.loads(schema.model_validate(obj).model_dump_json())
+
+def test_student_lists_match_their_schemas(client, db):
+    student = add_students(db, 1)[0]
+    rr = db.query(RebateRequest).first()
+    rr.document_path = "ab/" + "ab" * 32
+    rr.processed_at = dt.datetime(2025, 1, 2, 9, 30, 15, 123456)
+    db.add(MessBill(student_id=student.id, month="2025-01", total_amount=Decimal("3100.50"),
+                    rebate_amount=Decimal("300.25"), final_amount=Decimal("2800.25")))
+    db.commit()
+    db.expire_all()
+
+    expected_requests = sorted(
+        (_schema_dump(RebateRequestSchema, r) for r in db.query(RebateRequest)), key=lambda item: item["id"]
+    )
+    expected_bills = [_schema_dump(MessBillSchema, b) for b in db.query(MessBill)]
+
+    listed = client.get("/api/students/rebate-requests", headers=auth(student)).json()
+    assert sorted(listed, key=lambda item: item["id"]) == expected_requests
+
+    home = client.get("/api/students/home", headers=auth(student)).json()
+    assert sorted(home["rebate_requests"], key=lambda item: item["id"]) == expected_requests
+    assert home["mess_bills"] == expected_bills
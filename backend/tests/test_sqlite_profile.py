@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+from sqlalchemy import event, text
+
+from conftest import add_students, auth
+from config import settings
+from database import InstrumentedWriterPool, async_engine, engine, sqlite_tuned, write_engine
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size")
+EXPECTED = {
+    "journal_mode": settings.SQLITE_JOURNAL_MODE.lower(),
+    "synchronous": 1,  # NORMAL
+    "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": settings.SQLITE_MMAP_SIZE,
+    "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+}
+
+def _read(conn) -> dict:
+    return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in PRAGMAS}
+
+def test_every_engine_applies_the_pragmas(client):
+    assert sqlite_tuned
+
+    with engine.connect() as conn:
+        assert _read(conn) == EXPECTED
+
+    async def read_async(target):
+        async with target.connect() as conn:
+            return await conn.run_sync(_read)
+
+    for target in (async_engine, write_engine):
+        assert client.portal.call(read_async, target) == EXPECTED
+
+def test_writes_share_one_connection_and_begin_immediate(client):
+    assert write_engine is not async_engine
+    assert isinstance(write_engine.pool, InstrumentedWriterPool)
+    assert write_engine.pool.size() == 1
+    assert write_engine.pool._max_overflow == 0
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(write_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        async def write():
+            async with write_engine.begin() as conn:
+                await conn.execute(text("SELECT 1"))
+        client.portal.call(write)
+    finally:
+        event.remove(write_engine.sync_engine, "before_cursor_execute", listener)
+    assert statements[0] == "BEGIN IMMEDIATE"
+
+def test_concurrent_writes_do_not_hit_database_is_locked(client, db, admin):
+    students = add_students(db, 8)
+
+    async def hammer():
+        import main
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            updates = [
+                http.put("/api/students/profile", headers=auth(s), json={"room_number": str(300 + n)})
+                for n, s in enumerate(students)
+                for _ in range(3)
+            ]
+            reads = [http.get("/api/admin/rebate-requests", headers=auth(admin)) for _ in range(8)]
+            return await asyncio.gather(*updates, *reads)
+
+    responses = client.portal.call(hammer)
+    assert [r.status_code for r in responses] == [200] * len(responses)
@@ -5,6 +5,7 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
 import { Input } from "@/components/ui/input"
 import { UserNav } from "@/components/user-nav"
+import { adminAPI } from "@/lib/api"
 
 interface Student {
   id: number
@@ -24,15 +25,7 @@ export default function AdminStudentsPage() {
   useEffect(() => {
     const fetchStudents = async () => {
       try {
-        const token = localStorage.getItem("access_token")
-        const res = await fetch("http://localhost:8000/api/admin/students/list", {
-
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        })
-        if (!res.ok) throw new Error(await res.text())
-        const data = await res.json()
+        const { data } = await adminAPI.getStudentList()
         setStudents(data)
       } catch (err: any) {
         setError(err.message || "Something went wrong")
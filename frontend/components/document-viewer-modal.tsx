@@ -1,11 +1,12 @@
 "\"use client"
 
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from "@/components/ui/dialog"
+import { fileUrl } from "@/lib/api"
 
 interface DocumentViewerModalProps {
   isOpen: boolean
   onClose: () => void
-  documentUrl?: string
+  documentUrl?: string   // document_url from the API (a path under API_BASE_URL)
   studentName?: string
 }
 
@@ -16,7 +17,7 @@ export function DocumentViewerModal({ isOpen, onClose, documentUrl, studentName
         <DialogHeader>
           <DialogTitle>Document for {studentName}</DialogTitle>
         </DialogHeader>
-        {documentUrl ? <iframe src={documentUrl} width="100%" height="500px" /> : <p>No document to display.</p>}
+        {documentUrl ? <iframe src={fileUrl(documentUrl)} width="100%" height="500px" /> : <p>No document to display.</p>}
       </DialogContent>
     </Dialog>
   )
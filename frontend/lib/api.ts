@@ -24,16 +24,43 @@ const handleResponse = async (response: Response) => {
   return { data: await response.json() };
 };
 
-// Generic fetch wrapper
-const apiCall = async (endpoint: string, options: RequestInit = {}) => {
+// Authenticated fetch against the API
+const request = (endpoint: string, options: RequestInit = {}) => {
   const token = getAuthToken();
   const headers: Record<string, string> = {
     "Content-Type": "application/json",
     ...(options.headers as Record<string, string>),
   };
   if (token) headers["Authorization"] = `Bearer ${token}`;
-  const response = await fetch(`${API_BASE_URL}${endpoint}`, { ...options, headers });
-  return handleResponse(response);
+  return fetch(`${API_BASE_URL}${endpoint}`, { ...options, headers });
+};
+
+// Absolute URL of an API-served file (document_url / thumbnail_url) for <iframe>/<img>,
+// which can't send the Authorization header: the token goes in ?access_token=
+export const fileUrl = (path: string) => {
+  const token = getAuthToken();
+  const query = token ? `${path.includes("?") ? "&" : "?"}access_token=${encodeURIComponent(token)}` : "";
+  return `${API_BASE_URL}${path}${query}`;
+};
+
+// Generic fetch wrapper
+const apiCall = async (endpoint: string, options: RequestInit = {}) =>
+  handleResponse(await request(endpoint, options));
+
+// Admin lists are keyset-paginated: follow X-Next-Cursor to the last page
+const PAGE_SIZE = 500;
+export const apiCallAllPages = async (endpoint: string) => {
+  const items: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    const response = await request(`${endpoint}${endpoint.includes("?") ? "&" : "?"}${params}`);
+    const { data } = await handleResponse(response);
+    items.push(...data);
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return { data: items };
 };
 
 // Auth API (students + admins)
@@ -92,12 +119,18 @@ export const studentAPI = {
     return handleResponse(response);
   },
   getMessBills: () => apiCall("/api/students/mess-bills"),
+  // Profile, summary, requests and bills in one call; `fields` picks a subset
+  getHome: (fields?: string[]) =>
+    apiCall(`/api/students/home${fields ? `?fields=${fields.join(",")}` : ""}`),
 };
 
 // Admin API
 export const adminAPI = {
   // Fetch all students with summary
-  getStudents: () => apiCall("/api/admin/students"),
+  getStudents: () => apiCallAllPages("/api/admin/students"),
+
+  // Fetch the plain student list
+  getStudentList: () => apiCallAllPages("/api/admin/students/list"),
 
   // Fetch one student’s requests
   getStudentRequests: (studentId: number) =>
@@ -106,7 +139,7 @@ export const adminAPI = {
   // Fetch all rebate requests
   getAllRequests: (statusFilter?: string) => {
     const params = statusFilter ? `?status_filter=${statusFilter}` : "";
-    return apiCall(`/api/admin/rebate-requests${params}`);
+    return apiCallAllPages(`/api/admin/rebate-requests${params}`);
   },
 
   // Update rebate request (approve/reject)
@@ -133,6 +166,14 @@ export const adminAPI = {
   // Dashboard stats
   getDashboardStats: () => apiCall("/api/admin/dashboard-stats"),
 
+  // Daily mess headcount per hostel (defaults to the next two weeks)
+  getHeadcountForecast: (params?: { start?: string; end?: string; hostel?: string }) => {
+    const query = new URLSearchParams(
+      Object.entries(params || {}).filter(([, v]) => v) as [string, string][]
+    ).toString();
+    return apiCall(`/api/admin/headcount-forecast${query ? `?${query}` : ""}`);
+  },
+
   // Create mess bill
   createMessBill: (data: any) =>
     apiCall("/api/admin/mess-bills", { method: "POST", body: JSON.stringify(data) }),